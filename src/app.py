@@ -1,13 +1,13 @@
 """Main application controller."""
 import threading
 import time
-from typing import Optional
+import traceback
+from typing import Callable, Dict, List, Optional
 import sys
-import uuid
 
-from .models.user import User
-from .network.client import NetworkManager
-from .network.listener import UDPListener
+from .models.user import User, username_from_user_id
+from .network.client import NetworkManager, PEER_SOCKET_SWEEP
+from .network.listener import UDPListener, LISTENER_WORKERS
 from .services.user_service import UserService
 from .services.message_service import MessageService
 from .services.game_service import GameService
@@ -21,11 +21,15 @@ from .ui.dm_menu import DirectMessageMenu
 from .ui.game_menu import GameMenu
 from .ui.group_menu import GroupMenu
 from .utils.setup import create_user_profile
+from .utils.console import flush_console
 from .services.file_service import FileService
 from .ui.file_menu import FileMenu
 from .core import state as core_state
 
-from .network.protocol import build_message
+from .network.protocol import build_message, build_post, new_message_id
+
+EXIT_CHOICE = "8"  # handled by _main_loop itself, not the action table
+LISTENER_READY_TIMEOUT = 5.0  # seconds start() waits for each listener to bind
 
 class LSNPApplication:
     """Main LSNP application controller."""
@@ -34,6 +38,7 @@ class LSNPApplication:
         self.user: Optional[User] = None
         self.network_manager: Optional[NetworkManager] = None
         self.listener: Optional[UDPListener] = None
+        self.extra_listeners: List[UDPListener] = []  # SO_REUSEPORT unicast workers
         self.message_router: Optional[MessageRouter] = None
         
         # Services
@@ -53,7 +58,12 @@ class LSNPApplication:
         
         # Background threads
         self.listener_thread: Optional[threading.Thread] = None
-        self.running = False
+        self.extra_listener_threads: List[threading.Thread] = []
+        # Shared with the services through app_state; set by stop()
+        self._shutdown = core_state.app_state.shutdown_event
+
+        # Main menu choice -> action, built once in initialize()
+        self._menu_actions: Dict[str, Callable[[], None]] = {}
     
     def initialize(self) -> None:
         """Initialize the application."""
@@ -69,8 +79,14 @@ class LSNPApplication:
         # Initialize listener
         self.listener = UDPListener(
             self.message_router.route_message,
-            self.user.verbose
+            self.user.verbose,
+            reuse_port=LISTENER_WORKERS > 1
         )
+        self.extra_listeners = [
+            UDPListener(self.message_router.route_message, self.user.verbose,
+                        worker_index=i, reuse_port=True)
+            for i in range(1, LISTENER_WORKERS)
+        ]
         core_state.app_state.set_local_user(self.user.user_id)
         
         ts = int(time.time())
@@ -81,7 +97,7 @@ class LSNPApplication:
         self.user_service = UserService(self.network_manager)
         self.message_service = MessageService(self.network_manager)
         self.game_service = GameService(self.network_manager)
-        self.ping_service = PingService(self.network_manager)
+        self.ping_service = PingService(self.network_manager, self.listener)
         self.group_service = GroupService(self.network_manager)
         
         # Initialize UI components
@@ -100,107 +116,80 @@ class LSNPApplication:
         core_state.app_state.register_incoming_file_listener(self._on_incoming_offer)
         # create FileMenu
         self.file_menu = FileMenu(self.user, self.file_service, self.network_manager)
+
+        self._menu_actions = {
+            "0": self._toggle_verbose,
+            "1": self.peer_menu.show_peers,
+            "2": self.posts_menu.show_posts_menu,
+            "3": self.dm_menu.show_dm_menu,
+            "4": self.group_menu.show_group_menu,
+            "5": self.file_menu.show_file_menu,
+            "6": self.game_menu.show_game_menu,
+            "7": self._show_profile,
+            "9": self._make_expired_token,        # Debug: Make Expired Token
+            "10": self._make_mismatched_scope,    # Debug: Make Mismatched Scope
+        }
     
     def start(self) -> None:
         """Start the application."""
         if not self.user:
             raise RuntimeError("Application not initialized")
         
-        self.running = True
-        
-        # Start UDP listener in background
+        # Start the UDP listener's event loop in the background; the menus keep the main thread for input()
         self.listener_thread = threading.Thread(
             target=self.listener.start,
             daemon=True
         )
         self.listener_thread.start()
+        for worker in self.extra_listeners:
+            t = threading.Thread(target=worker.start, daemon=True)
+            t.start()
+            self.extra_listener_threads.append(t)
         
-        # Give listener time to start
-        time.sleep(1)
+        # Wait until the listeners are receiving, so replies to the profile broadcast aren't missed
+        for listener in [self.listener, *self.extra_listeners]:
+            listener.ready.wait(LISTENER_READY_TIMEOUT)
         
         # Broadcast initial profile
         self.user_service.broadcast_profile(self.user)
         
         # Start ping service
         self.ping_service.start_ping_service(self.user)
+        # Close sockets left behind by peers that expired or changed IP
+        self.listener.call_every(PEER_SOCKET_SWEEP, self.network_manager.prune_peer_sockets,
+                                 first_delay=PEER_SOCKET_SWEEP)
         
         # Start main UI loop
         self._main_loop()
     
     def stop(self) -> None:
         """Stop the application."""
-        self.running = False
+        self._shutdown.set()
+        core_state.app_state.stop_file_offer_dispatch()
         if self.listener:
             self.listener.stop()
+        for worker in self.extra_listeners:
+            worker.stop()
         if self.ping_service:
             self.ping_service.stop_ping_service()
+        if self.network_manager:
+            self.network_manager.flush()
+            self.network_manager.close()
+        flush_console()  # handler output still queued
     
     def _main_loop(self) -> None:
         """Main application loop."""
-        while self.running:
+        while not self._shutdown.is_set():
             try:
                 choice = self.main_menu.show()
                 
                 if choice is None:
                     continue
-                
-                if choice == "0":
-                    self.main_menu.toggle_verbose()
-                    # Update network manager verbose setting
-                    self.network_manager.verbose = self.user.verbose
-                    # Update all handlers/services that use verbose
-                    if self.message_router:
-                        self.message_router.verbose = self.user.verbose
-                        # Update handler instances inside the router
-                        self.message_router.ping_handler.verbose = self.user.verbose
-                        self.message_router.profile_handler.verbose = self.user.verbose
-                        self.message_router.dm_handler.verbose = self.user.verbose
-                        self.message_router.post_handler.verbose = self.user.verbose
-                        self.message_router.like_handler.verbose = self.user.verbose
-                        self.message_router.game_handler.verbose = self.user.verbose
-                        self.message_router.group_handler.verbose = self.user.verbose
-                    if self.listener:
-                        self.listener.verbose = self.user.verbose
-                    if self.file_service:
-                        self.file_service.verbose = self.user.verbose
-                
-                elif choice == "1":
-                    self.peer_menu.show_peers()
-                
-                elif choice == "2":
-                    self.posts_menu.show_posts_menu()
-                
-                elif choice == "3":
-                    self.dm_menu.show_dm_menu()
-                
-                elif choice == "4":
-                    self.group_menu.show_group_menu()
-                
-                elif choice == "5":
-                    self.file_menu.show_file_menu()
-
-                elif choice == "6":
-                    self.game_menu.show_game_menu()
-                
-                elif choice == "7":
-                    self.main_menu.show_profile()
-                    self._show_additional_profile_info()
-                
-                elif choice == "8":
-                    print("\nLogging out and exiting LSNP...\n")
-                    self.logout()   # broadcasts REVOKE, stops services, exits process
+                if choice == EXIT_CHOICE:
+                    self._exit()
                     break
                 
-                elif choice == "9":
-                    # Debug: Make Expired Token
-                    self._make_expired_token()
-
-                elif choice == "10":
-                    # Debug: Make Mismatched Scope
-                    self._make_mismatched_scope()
-                
-                else:
-                    print("That feature is not yet implemented.\n")
+                self._menu_actions.get(choice, self._unknown_choice)()
             
             except KeyboardInterrupt:
                 print("\n\nExiting LSNP...\n")
@@ -209,12 +198,47 @@ class LSNPApplication:
             except Exception as e:
                 print(f"❌ An error occurred: {e}")
                 if self.user and self.user.verbose:
-                    import traceback
                     traceback.print_exc()
     
+    def _toggle_verbose(self) -> None:
+        """Toggle verbose mode and propagate it to every component that logs."""
+        self.main_menu.toggle_verbose()
+        # Update network manager verbose setting
+        self.network_manager.verbose = self.user.verbose
+        # Update all handlers/services that use verbose
+        if self.message_router:
+            self.message_router.verbose = self.user.verbose
+            # Update handler instances inside the router
+            self.message_router.ping_handler.verbose = self.user.verbose
+            self.message_router.profile_handler.verbose = self.user.verbose
+            self.message_router.dm_handler.verbose = self.user.verbose
+            self.message_router.post_handler.verbose = self.user.verbose
+            self.message_router.like_handler.verbose = self.user.verbose
+            self.message_router.game_handler.verbose = self.user.verbose
+            self.message_router.group_handler.verbose = self.user.verbose
+        if self.listener:
+            self.listener.verbose = self.user.verbose
+        for worker in self.extra_listeners:
+            worker.verbose = self.user.verbose
+        if self.file_service:
+            self.file_service.verbose = self.user.verbose
+
+    def _show_profile(self) -> None:
+        """Show the local profile plus stored peer/DM/group stats."""
+        self.main_menu.show_profile()
+        self._show_additional_profile_info()
+
+    def _exit(self) -> None:
+        """Log out and exit the process."""
+        print("\nLogging out and exiting LSNP...\n")
+        self.logout()   # broadcasts REVOKE, stops services, exits process
+
+    def _unknown_choice(self) -> None:
+        print("That feature is not yet implemented.\n")
+
     def _show_additional_profile_info(self) -> None:
         """Show additional profile information."""
-        from .core.state import app_state
+        app_state = core_state.app_state
         
         peers = app_state.get_active_peers()
         conversations = self.message_service.get_dm_conversations()
@@ -225,8 +249,7 @@ class LSNPApplication:
         print(f"Groups: {len(groups)}")
         
         for user_id, msg_count in conversations.items():
-            peer = app_state.get_peer(user_id)
-            display_name = peer.display_name if peer else user_id.split("@")[0]
+            display_name = app_state.get_display_name(user_id)
             print(f"  - {display_name} ({user_id}): {msg_count} messages")
         
         if groups:
@@ -239,7 +262,7 @@ class LSNPApplication:
         print()
     
     def _on_incoming_offer(self, fileid: str, offer: dict) -> None:
-        from_user = offer.get("from", "").split("@")[0]
+        from_user = username_from_user_id(offer.get("from", ""))
         print(f"\nIncoming file offer {fileid} from {from_user}: {offer.get('filename')} ({offer.get('filesize')} bytes)")
         print("Open Files menu to accept or reject.")
 
@@ -248,23 +271,13 @@ class LSNPApplication:
         if self.ping_service:
             self.ping_service.stop_ping_service()
 
-        # Send one REVOKE (suppression signal)
-        ptoks = core_state.app_state.get_revocable_tokens()
-        if ptoks:
-            for tok in ptoks[:1]:
-                self.network_manager.send_broadcast(
-                    build_message({"TYPE": "REVOKE", "TOKEN": tok})
-                )
-                if self.user and self.user.verbose:
-                    print(f"TYPE: REVOKE \nTOKEN: {tok}")
-        else:
-            exp = int(time.time()) + 60
-            tok = f"{self.user.user_id}|{exp}|broadcast"
-            self.network_manager.send_broadcast(
-                build_message({"TYPE": "REVOKE", "TOKEN": tok})
-            )
-            if self.user and self.user.verbose:
-                print(f"TYPE: REVOKE \nTOKEN: {tok}")
+        # Send one REVOKE (suppression signal), using a fresh token if none is still live
+        tok = core_state.app_state.first_revocable_token()
+        if tok is None:
+            tok = f"{self.user.user_id}|{int(time.time()) + 60}|broadcast"
+        self.network_manager.send_broadcast(build_message({"TYPE": "REVOKE", "TOKEN": tok}))
+        if self.user and self.user.verbose:
+            print(f"TYPE: REVOKE \nTOKEN: {tok}")
 
         self.stop()
         sys.exit(0)
@@ -274,16 +287,8 @@ class LSNPApplication:
         """Broadcast a POST using the given token so the router can validate/drop it."""
         if not self.network_manager or not self.user:
             return
-        fields = {
-            "TYPE": "POST",
-            "USER_ID": self.user.user_id,
-            "CONTENT": f"[TEST] {label}",
-            "TIMESTAMP": int(time.time()),
-            "TTL": 3600,
-            "MESSAGE_ID": uuid.uuid4().hex[:8],
-            "TOKEN": token,
-        }
-        msg = build_message(fields)
+        msg = build_post(self.user.user_id, f"[TEST] {label}", int(time.time()), 3600,
+                         new_message_id(), token)
         self.network_manager.send_broadcast(msg)
         if self.user.verbose:
             print(f"[TEST] Sent POST with {label} token.")
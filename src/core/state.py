@@ -1,121 +1,233 @@
 """Central application state management."""
-from typing import Dict, List, Set, Optional, Callable
+import heapq
+from functools import lru_cache
+import itertools
+import queue
+from collections import deque
+from types import MappingProxyType
+from typing import Deque, Dict, FrozenSet, List, Mapping, Set, Optional, Callable, Tuple
+import sys
 import threading
 from threading import Lock
 import time
 
-from ..models.user import Peer, DirectMessage, Post
+from ..models.user import Peer, DirectMessage, Post, username_from_user_id
 from ..models.game import TicTacToeInvite, TicTacToeGame
 from ..models.group import Group, GroupMessage
 
+MAX_POSTS = 500  # oldest posts drop off the feed beyond this many
+MAX_DM_HISTORY = 1000  # per conversation
+MAX_GROUP_HISTORY = 1000  # per group
+MAX_LISTENER_FAILURES = 5  # file offer callbacks are dropped after this many errors
+
+
+@lru_cache(maxsize=1024)
+def _parse_token(token: str) -> Optional[Tuple[str, int, str]]:
+    """Parse a user_id|expiry|scope token, memoized since the same tokens arrive on every message."""
+    try:
+        user_id, exp_str, scope = token.split("|", 3)[:3]
+        return user_id, int(exp_str), scope
+    except Exception:
+        return None
+
+
 class ApplicationState:
     """Centralized application state manager."""
+
+    # Fixed attribute set: faster attribute access on the hot singleton, and typos fail loudly
+    __slots__ = (
+        "_peers_lock", "_follow_lock", "_posts_lock", "_dm_lock", "_games_lock", "_groups_lock", "_tokens_lock", "_acks_lock", "_listeners_lock",
+        "_peers", "_display_names", "_active_peers", "_peer_expiry", "_suppressed_peers", "_suppress_expiry", "_names_version",
+        "_following", "_followed_names",
+        "_post_feed", "_post_seq", "_post_expiry", "_post_index", "_posts_by_mid", "_posts_by_author", "_posts_by_name",
+        "_dm_history", "_dm_ids", "_dm_snapshots", "_dm_counts", "_dm_counts_view", "_active_dm_user", "_local_user_id",
+        "_ttt_invites", "_ttt_games", "_ttt_invites_by_user", "_ttt_invites_by_game", "_ttt_games_by_user",
+        "_groups", "_groups_by_member", "_group_messages", "_group_snapshots",
+        "_incoming_file_listeners", "_file_offer_queue", "_file_offer_thread", "_file_listener_failures", "_pending_acks",
+        "_presence_token", "_revoked_tokens", "_revoke_expiry", "_issued_tokens",
+        "shutdown_event", "file_service",
+    )
     
     def __init__(self):
-        self._lock = Lock()
+        # One lock per data domain, so e.g. the listener updating peers never waits on the
+        # UI reading posts. No method holds two at once. Locks guard writes and reads that
+        # iterate or span several fields; single-key reads (dict.get, `in`, reading one
+        # attribute) are atomic on their own and skip them.
+        self._peers_lock = Lock()    # peers, display names, active/suppressed peers
+        self._follow_lock = Lock()   # following
+        self._posts_lock = Lock()    # feed and its indices
+        self._dm_lock = Lock()       # DM history, active DM user, local user
+        self._games_lock = Lock()    # TTT invites and games
+        self._groups_lock = Lock()   # groups and group messages
+        self._tokens_lock = Lock()   # issued/revoked tokens, presence token
+        self._acks_lock = Lock()     # pending ACK events
+        self._listeners_lock = Lock()  # file offer listeners (writers only; readers take the tuple)
 
         # Network state
         self._peers: Dict[str, Peer] = {}
-        self._user_ip_map: Dict[str, str] = {}
+        self._display_names: Dict[str, str] = {}  # user_id -> display name, kept in step with _peers
+        # Active peers are tracked as packets arrive so menus don't scan every peer.
+        # Each active peer has exactly one (expire_at, user_id) heap entry; when it
+        # comes due, a peer seen again since is rescheduled rather than dropped.
+        self._active_peers: Dict[str, float] = {}  # user_id -> scheduled expire_at
+        self._peer_expiry: List[tuple] = []
 
         # Social features
-        self._following: Set[str] = set()
-        self._post_feed: List[Post] = []
-        self._dm_history: Dict[str, List[DirectMessage]] = {}
+        # Swapped for a new frozenset on change, so readers can hold it without copying
+        self._following: FrozenSet[str] = frozenset()
+        # (following, names version, display names of followed peers) for the feed's name
+        # fallback; rebuilt when the follow set is swapped or a followed peer is renamed
+        self._followed_names: Optional[tuple] = None
+        self._names_version = 0  # bumped after a followed peer's display name changes
+        # Feed and its indices hold (arrival seq, post) entries, oldest first; the indices
+        # let the followed-only view merge just the relevant buckets instead of filtering the whole feed.
+        self._post_feed: Deque[tuple] = deque(maxlen=MAX_POSTS)
+        self._posts_by_author: Dict[str, Deque[tuple]] = {}
+        self._posts_by_name: Dict[str, Deque[tuple]] = {}  # display-name fallback
+        self._post_seq = itertools.count()
+        self._post_expiry: List[tuple] = []  # heap of (expires_at, seq, post) for TTL cleanup
+        self._post_index: Dict[Tuple[str, float], Post] = {}  # (user_id, timestamp) -> post, for find_post
+        self._posts_by_mid: Dict[str, Post] = {}  # message_id -> post, for LIKE lookups
+        self._dm_history: Dict[str, Deque[DirectMessage]] = {}
+        self._dm_ids: Dict[str, Set[str]] = {}  # message_ids held in each conversation, for dedupe
+        self._dm_snapshots: Dict[str, Tuple[DirectMessage, ...]] = {}  # immutable history copies, dropped on append
+        self._dm_counts: Dict[str, int] = {}  # user_id -> messages kept, updated by add_dm
+        self._dm_counts_view: Optional[Mapping[str, int]] = MappingProxyType({})  # read-only copy, rebuilt after a change
         self._active_dm_user: Optional[str] = None
 
         # Game state
         self._ttt_invites: Dict[tuple, TicTacToeInvite] = {}
         self._ttt_games: Dict[str, TicTacToeGame] = {}
+        # Per-user indices so status lookups don't scan every invite/game.
+        # Buckets are dicts used as insertion-ordered sets.
+        self._ttt_invites_by_user: Dict[str, Dict[tuple, None]] = {}  # from_user -> invite keys
+        self._ttt_invites_by_game: Dict[str, Dict[tuple, None]] = {}  # game_id -> invite keys
+        self._ttt_games_by_user: Dict[str, Dict[str, None]] = {}      # player -> game_ids
         
         # Group state
         self._groups: Dict[str, Group] = {}
-        self._group_messages: Dict[str, List[GroupMessage]] = {}
+        self._groups_by_member: Dict[str, Dict[str, None]] = {}  # user_id -> group_ids
+        self._group_messages: Dict[str, Deque[GroupMessage]] = {}
+        self._group_snapshots: Dict[str, Tuple[GroupMessage, ...]] = {}  # like _dm_snapshots
 
         # File offer listeners (UI callbacks)
-        self._incoming_file_listeners: List[Callable[[str, dict], None]] = []
+        self._incoming_file_listeners: Tuple[Callable[[str, dict], None], ...] = ()  # replaced, never mutated
+        # Offers are handed to one dispatcher thread so slow UI callbacks never hold up the listener
+        self._file_offer_queue: "queue.SimpleQueue[Optional[Tuple[str, dict]]]" = queue.SimpleQueue()
+        self._file_offer_thread: Optional[threading.Thread] = None
+        self._file_listener_failures: Dict[Callable[[str, dict], None], int] = {}
         self._pending_acks: Dict[str, threading.Event] = {}
         
         self._suppressed_peers: Dict[str, float] = {}  # user_id -> suppress_until_ts
+        self._suppress_expiry: List[Tuple[float, str]] = []  # heap of (suppress_until_ts, user_id)
         self._presence_token: Optional[str] = None
         self._revoked_tokens: Dict[str, float] = {}  # token -> expiry_ts
-        self._issued_tokens: Set[str] = set()       # tokens we've sent
+        self._revoke_expiry: List[Tuple[float, str]] = []  # heap of (expiry_ts, token)
+        self._issued_tokens: Dict[str, int] = {}    # tokens we've sent -> expiry_ts
 
         self._local_user_id: Optional[str] = None
 
+        # Set once when the application shuts down; background loops wait on it instead of sleeping
+        self.shutdown_event = threading.Event()
+
+        # FileService, attached by the application once it exists (handlers look it up here)
+        self.file_service = None
+
     # Revoking
-    def _sweep_suppressed(self) -> None:
-        now = time.time()
-        expired = [u for u, ts in self._suppressed_peers.items() if ts <= now]
-        for u in expired:
-            self._suppressed_peers.pop(u, None)
+    @staticmethod
+    def _sweep_expired(entries: Dict[str, float], heap: List[Tuple[float, str]], now: float) -> None:
+        """Drop entries whose expiry has passed, popping only the due part of their heap."""
+        while heap and heap[0][0] <= now:
+            expiry, key = heapq.heappop(heap)
+            if entries.get(key) == expiry:  # else re-added or removed since
+                del entries[key]
 
     def suppress_peer(self, user_id: str, seconds: int = 60) -> None:
         """Hide a peer from active lists for N seconds."""
-        with self._lock:
-            self._suppressed_peers[user_id] = time.time() + seconds
+        with self._peers_lock:
+            until = time.time() + seconds
+            self._suppressed_peers[user_id] = until
+            heapq.heappush(self._suppress_expiry, (until, user_id))
 
     def unsuppress_peer(self, user_id: str) -> None:
-        with self._lock:
+        with self._peers_lock:
             self._suppressed_peers.pop(user_id, None)
     
     def get_active_peers(self, exclude_user_id: Optional[str] = None) -> List[Peer]:
         """Get all active (recent) peers, excluding suppressed ones."""
-        with self._lock:
-            self._sweep_suppressed()
+        with self._peers_lock:
             now = time.time()
-            peers = [
-                p for p in self._peers.values()
-                if p.is_active and not (p.user_id in self._suppressed_peers and self._suppressed_peers[p.user_id] > now)
+            self._sweep_expired(self._suppressed_peers, self._suppress_expiry, now)
+            self._expire_peers(now)
+            # The sweep leaves only suppressions still in force, so membership is enough
+            suppressed = self._suppressed_peers
+            peers = self._peers
+            return [
+                peers[uid] for uid in self._active_peers
+                if uid not in suppressed and uid != exclude_user_id
             ]
-            if exclude_user_id:
-                peers = [p for p in peers if p.user_id != exclude_user_id]
-            return peers
 
-    def _sweep_revoked(self) -> None:
-        now = time.time()
-        to_del = [tok for tok, exp in self._revoked_tokens.items() if exp <= now]
-        for tok in to_del:
-            self._revoked_tokens.pop(tok, None)
+    def _expire_peers(self, now: float) -> None:
+        """Drop peers whose last PING/PROFILE is older than their timeout. Caller holds the peers lock."""
+        heap = self._peer_expiry
+        while heap and heap[0][0] <= now:
+            expire_at, uid = heapq.heappop(heap)
+            if self._active_peers.get(uid) != expire_at:
+                continue  # left over from a peer removed and re-added since
+            peer = self._peers.get(uid)
+            if peer is None or peer.last_seen + peer.timeout <= now:
+                del self._active_peers[uid]
+            else:
+                expire_at = peer.last_seen + peer.timeout
+                self._active_peers[uid] = expire_at
+                heapq.heappush(heap, (expire_at, uid))
+
 
     def register_issued_token(self, token: str) -> None:
-        with self._lock:
-            self._issued_tokens.add(token)
+        if token in self._issued_tokens:
+            return  # the same token goes out with every message
+        parsed = self.parse_token(token)
+        if not parsed:
+            return  # never revocable anyway
+        with self._tokens_lock:
+            self._issued_tokens[token] = parsed[1]
 
     def parse_token(self, token: str):
         """Return (user_id, expiry_ts:int, scope) or None if malformed."""
-        try:
-            user_id, exp_str, scope = token.split("|", 3)[:3]
-            return user_id, int(exp_str), scope
-        except Exception:
-            return None
+        return _parse_token(token)
 
     def get_revocable_tokens(self) -> list[str]:
         """Tokens we issued that are still in the future (worth revoking)."""
         now = int(time.time())
-        with self._lock:
-            out = []
-            for tok in self._issued_tokens:
-                parsed = self.parse_token(tok)
-                if parsed and parsed[1] > now:
-                    out.append(tok)
-            return out
+        with self._tokens_lock:
+            return [tok for tok, expiry in self._issued_tokens.items() if expiry > now]
+
+    def first_revocable_token(self) -> Optional[str]:
+        """Any one token from get_revocable_tokens(), without collecting the rest."""
+        now = int(time.time())
+        with self._tokens_lock:
+            for tok, expiry in self._issued_tokens.items():
+                if expiry > now:
+                    return tok
+        return None
 
     def revoke_token(self, token: str) -> None:
         parsed = self.parse_token(token)
         if not parsed:
             return
         _, expiry, _ = parsed
-        with self._lock:
+        with self._tokens_lock:
+            # Sweep expired revocations here, on the rare write, so lookups stay lock-free
+            self._sweep_expired(self._revoked_tokens, self._revoke_expiry, time.time())
             self._revoked_tokens[token] = float(expiry)
+            heapq.heappush(self._revoke_expiry, (float(expiry), token))
 
     def is_token_revoked(self, token: str) -> bool:
-        now = time.time()
-        with self._lock:
-            # sweep expired revocations
-            for t in [t for t,e in self._revoked_tokens.items() if e <= now]:
-                self._revoked_tokens.pop(t, None)
-            return token in self._revoked_tokens
+        return self._is_token_revoked_at(token, time.time())
+
+    def _is_token_revoked_at(self, token: str, now: float) -> bool:
+        expiry = self._revoked_tokens.get(token)
+        return expiry is not None and expiry > now
 
     def validate_token(self, token: str, expected_scope: str) -> tuple[bool, str]:
         """Check (not expired, scope matches, not revoked). Returns (ok, reason)."""
@@ -123,121 +235,218 @@ class ApplicationState:
         if not parsed:
             return False, "malformed"
         user_id, expiry, scope = parsed
-        now = int(time.time())
-        if now > expiry:
+        now = time.time()  # one clock read for both the expiry and revocation checks
+        if int(now) > expiry:
             return False, "expired"
         if scope != expected_scope:
             return False, "scope_mismatch"
-        if self.is_token_revoked(token):
+        if self._is_token_revoked_at(token, now):
             return False, "revoked"
         return True, ""
     
     # Peer management
     def add_peer(self, peer: Peer) -> None:
         """Add or update a peer."""
-        with self._lock:
+        with self._peers_lock:
             self._peers[peer.user_id] = peer
-            self._user_ip_map[peer.user_id] = peer.ip
+            renamed = self._display_names.get(peer.user_id) != peer.display_name
+            self._display_names[peer.user_id] = peer.display_name
+            if renamed and peer.user_id in self._following:
+                self._names_version += 1  # after the write, so a cache built in between is rebuilt
+            if peer.user_id not in self._active_peers:
+                # Already-active peers keep their entry; it is pushed back when it comes due
+                expire_at = peer.last_seen + peer.timeout
+                self._active_peers[peer.user_id] = expire_at
+                heapq.heappush(self._peer_expiry, (expire_at, peer.user_id))
     
     def get_peer(self, user_id: str) -> Optional[Peer]:
         """Get a peer by user ID."""
-        with self._lock:
-            return self._peers.get(user_id)
+        return self._peers.get(user_id)
+    
+    def get_display_name(self, user_id: str) -> str:
+        """Display name for user_id, or its username part if the peer isn't known."""
+        name = self._display_names.get(user_id)
+        return name if name is not None else username_from_user_id(user_id)
     
     def get_peer_ip(self, user_id: str) -> Optional[str]:
-        """Get IP address for a user."""
-        with self._lock:
-            return self._user_ip_map.get(user_id)
+        """Get IP address for a known peer."""
+        peer = self._peers.get(user_id)
+        return peer.ip if peer is not None else None
     
     def update_peer_ip(self, user_id: str, ip: str) -> None:
-        """Update IP address for a user."""
-        with self._lock:
-            self._user_ip_map[user_id] = ip
+        """Update a known peer's IP address. Unknown senders are resolved from the @ip in their user_id."""
+        peer = self._peers.get(user_id)
+        if peer is not None and peer.ip != ip:
+            peer.ip = ip  # a single attribute store, atomic without the lock
     
     def set_presence_token(self, token: str) -> None:
-        with self._lock:
+        with self._tokens_lock:
             self._presence_token = token
-            self._issued_tokens.add(token)  # so you can revoke it later
+        self.register_issued_token(token)  # so you can revoke it later
 
     def get_presence_token(self) -> Optional[str]:
-        with self._lock:
-            return self._presence_token
+        return self._presence_token
 
     def remove_peer(self, user_id: str) -> None:
-        with self._lock:
+        with self._peers_lock:
             self._peers.pop(user_id, None)
-            self._user_ip_map.pop(user_id, None)
+            self._display_names.pop(user_id, None)
+            if user_id in self._following:
+                self._names_version += 1
+            self._active_peers.pop(user_id, None)
     
     # Following management
     def follow_user(self, user_id: str) -> None:
         """Follow a user."""
-        with self._lock:
-            self._following.add(user_id)
+        with self._follow_lock:
+            self._following = self._following | {sys.intern(user_id)}
     
     def unfollow_user(self, user_id: str) -> None:
         """Unfollow a user."""
-        with self._lock:
-            self._following.discard(user_id)
+        with self._follow_lock:
+            self._following = self._following - {user_id}
     
     def is_following(self, user_id: str) -> bool:
         """Check if following a user."""
-        with self._lock:
-            return user_id in self._following
+        return user_id in self._following
     
-    def get_following(self) -> Set[str]:
-        """Get set of followed users."""
-        with self._lock:
-            return self._following.copy()
+    def get_following(self) -> FrozenSet[str]:
+        """Get a snapshot of followed users."""
+        return self._following
     
     # Post management
     def add_post(self, post: Post) -> None:
         """Add a post to the feed."""
-        with self._lock:
-            self._post_feed.append(post)
-    
-    def get_posts(self, filter_followed: bool = False, user_id: Optional[str] = None) -> List[Post]:
-        """Get posts, optionally filtered by followed users."""
-        with self._lock:
-            posts = list(self._post_feed)
-            
+        with self._posts_lock:
+            self._expire_posts(time.time())
+            if len(self._post_feed) == self._post_feed.maxlen:
+                # The oldest post is also the oldest in its author and name buckets
+                evicted = self._post_feed[0][1]
+                self._index_popleft(self._posts_by_author, evicted.user_id)
+                self._index_popleft(self._posts_by_name, evicted.display_name)
+                self._unindex_post(evicted)
+            entry = (next(self._post_seq), post)
+            self._post_feed.append(entry)
+            self._posts_by_author.setdefault(post.user_id, deque()).append(entry)
+            self._posts_by_name.setdefault(post.display_name, deque()).append(entry)
+            self._post_index[(post.user_id, post.timestamp)] = post
+            if post.message_id:
+                self._posts_by_mid[post.message_id] = post
+            if len(self._post_expiry) >= 2 * MAX_POSTS:
+                # Entries for posts already pushed out of the feed linger until their TTL; rebuild
+                self._post_expiry = [(p.timestamp + p.ttl, seq, p) for seq, p in self._post_feed]
+                heapq.heapify(self._post_expiry)
+            heapq.heappush(self._post_expiry, (post.timestamp + post.ttl, entry[0], post))
+
+    def _expire_posts(self, now: float) -> None:
+        """Drop posts whose TTL has run out from the feed and its indices. Caller holds the posts lock."""
+        heap = self._post_expiry
+        if not heap or heap[0][0] > now:
+            return
+        due = {}
+        while heap and heap[0][0] <= now:
+            _, seq, post = heapq.heappop(heap)
+            due[seq] = post
+        self._drop_entries(self._post_feed, due)
+        for post in due.values():
+            self._unindex_post(post)
+            for index, key in ((self._posts_by_author, post.user_id),
+                               (self._posts_by_name, post.display_name)):
+                bucket = index.get(key)
+                if bucket is not None:
+                    self._drop_entries(bucket, due)
+                    if not bucket:
+                        del index[key]
+
+    def _unindex_post(self, post: Post) -> None:
+        """Drop post from the lookup indexes unless a newer post took its key. Caller holds the posts lock."""
+        key = (post.user_id, post.timestamp)
+        if self._post_index.get(key) is post:
+            del self._post_index[key]
+        if self._posts_by_mid.get(post.message_id) is post:
+            del self._posts_by_mid[post.message_id]
+
+    @staticmethod
+    def _drop_entries(entries: Deque[tuple], due: Dict[int, Post]) -> None:
+        """Remove the (seq, post) entries whose seq is in due, keeping order."""
+        kept = [e for e in entries if e[0] not in due]
+        if len(kept) != len(entries):
+            entries.clear()
+            entries.extend(kept)
+
+    @staticmethod
+    def _index_popleft(index: Dict[str, Deque[tuple]], key: str) -> None:
+        bucket = index.get(key)
+        if bucket:
+            bucket.popleft()
+            if not bucket:
+                del index[key]
+    
+    def get_posts(self, filter_followed: bool = False, user_id: Optional[str] = None,
+                  limit: Optional[int] = None) -> List[Post]:
+        """Get posts, optionally filtered by followed users; only the newest `limit` if given."""
+        with self._posts_lock:
+            self._expire_posts(time.time())
             if filter_followed and user_id:
-                # Show posts from followed users + own posts
-                posts = [p for p in posts if self._should_show_post(p, user_id)]
-            
-            return posts
-    
-    def _should_show_post(self, post: Post, user_id: str) -> bool:
-        """Check if post should be shown to user."""
-        if post.user_id == user_id:
-            return True
-        
-        if post.user_id in self._following:
-            return True
-        
-        # Fallback: match by display name if user_id changed
-        for followed_uid in self._following:
-            peer = self._peers.get(followed_uid)
-            if peer and peer.display_name == post.display_name:
-                return True
-        
-        return False
+                # Show posts from followed users + own posts, plus posts whose display
+                # name matches a followed peer's (in case their user_id changed)
+                following = self._following
+                by_author = self._posts_by_author
+                buckets = [by_author[uid] for uid in following if uid in by_author]
+                if user_id not in following and user_id in by_author:
+                    buckets.append(by_author[user_id])
+                buckets += [self._posts_by_name[name]
+                            for name in self._followed_display_names(following) if name in self._posts_by_name]
+                posts = []
+                last_seq = -1
+                # Newest first, so a limit stops the merge early
+                for seq, post in heapq.merge(*(reversed(b) for b in buckets), key=lambda e: e[0], reverse=True):
+                    if seq != last_seq:  # a post can sit in both an author and a name bucket
+                        posts.append(post)
+                        last_seq = seq
+                        if len(posts) == limit:
+                            break
+                posts.reverse()
+                return posts
+            feed = self._post_feed
+            if limit:
+                return [post for _, post in itertools.islice(feed, max(len(feed) - limit, 0), None)]
+            return [post for _, post in feed]
+
+    def get_post_stats(self) -> Tuple[int, List[str]]:
+        """Number of posts in the feed and the user_ids that authored them."""
+        with self._posts_lock:
+            self._expire_posts(time.time())
+            return len(self._post_feed), list(self._posts_by_author)
+
+    def _followed_display_names(self, following: FrozenSet[str]) -> FrozenSet[str]:
+        """Display names of the followed peers that are currently known. Caller holds the posts lock."""
+        version = self._names_version
+        cached = self._followed_names
+        if cached is None or cached[0] is not following or cached[1] != version:
+            names = [self._display_names.get(uid) for uid in following]
+            cached = self._followed_names = (following, version, frozenset(n for n in names if n is not None))
+        return cached[2]
     
     def find_post(self, user_id: str, timestamp: float) -> Optional[Post]:
         """Find a post by user and timestamp."""
-        with self._lock:
-            for post in self._post_feed:
-                if post.user_id == user_id and post.timestamp == timestamp:
-                    return post
-            return None
+        return self._post_index.get((user_id, timestamp))
+
+    def find_post_by_message_id(self, message_id: str) -> Optional[Post]:
+        """Find a post in the feed by its MESSAGE_ID (the POST_ID that LIKEs carry)."""
+        return self._posts_by_mid.get(message_id)
     
     # Direct message management
     def set_local_user(self, user_id: str) -> None:
-        with self._lock:
+        with self._dm_lock:
             self._local_user_id = user_id
 
-    def add_dm(self, message: DirectMessage) -> None:
-        """Store DM under the other party's user_id so a single thread shows both directions."""
-        with self._lock:
+    def add_dm(self, message: DirectMessage) -> bool:
+        """
+        Store DM under the other party's user_id so a single thread shows both directions.
+        Returns False if a message with the same message_id is already stored.
+        """
+        with self._dm_lock:
             if self._local_user_id:
                 if message.from_user == self._local_user_id:
                     key = message.to_user        # outgoing -> store under recipient
@@ -248,112 +457,169 @@ class ApplicationState:
             else:
                 key = message.from_user          # legacy fallback
 
+            history = self._dm_history.get(key)
+            if history is None:
+                history = self._dm_history[key] = deque(maxlen=MAX_DM_HISTORY)
+                self._dm_ids[key] = set()
+            ids = self._dm_ids[key]
+
             # Deduplicate by message_id
-            if key not in self._dm_history:
-                self._dm_history[key] = []
-            if message.message_id and any(dm.message_id == message.message_id for dm in self._dm_history[key]):
-                return  # Already exists, skip
-            self._dm_history[key].append(message)
+            if message.message_id and message.message_id in ids:
+                return False  # Already exists, skip
+            if len(history) == history.maxlen:
+                ids.discard(history[0].message_id)  # about to be evicted
+            history.append(message)
+            self._dm_snapshots.pop(key, None)
+            if self._dm_counts.get(key) != len(history):
+                self._dm_counts[key] = len(history)
+                self._dm_counts_view = None
+            if message.message_id:
+                ids.add(message.message_id)
+            return True
 
     
-    def get_dm_history(self, user_id: str) -> List[DirectMessage]:
-        """Get DM history with a user."""
-        with self._lock:
-            return self._dm_history.get(user_id, []).copy()
+    def get_dm_history(self, user_id: str, limit: Optional[int] = None) -> Tuple[DirectMessage, ...]:
+        """Get DM history with a user; only the last `limit` messages if given."""
+        with self._dm_lock:
+            snapshot = self._dm_snapshots.get(user_id)
+            if snapshot is None:
+                history = self._dm_history.get(user_id)
+                if not history:
+                    return ()
+                if limit:
+                    return tuple(itertools.islice(history, max(len(history) - limit, 0), None))
+                # Reused by every later call until the next message arrives
+                snapshot = self._dm_snapshots[user_id] = tuple(history)
+        return snapshot[-limit:] if limit else snapshot
     
     def set_active_dm_user(self, user_id: Optional[str]) -> None:
         """Set the currently active DM user."""
-        with self._lock:
+        with self._dm_lock:
             self._active_dm_user = user_id
     
     def get_active_dm_user(self) -> Optional[str]:
         """Get the currently active DM user."""
-        with self._lock:
-            return self._active_dm_user
-    
-    def get_dm_conversations(self) -> Dict[str, int]:
-        """Get DM conversations with message counts."""
-        with self._lock:
-            return {uid: len(messages) for uid, messages in self._dm_history.items()}
+        return self._active_dm_user
+    
+    def get_dm_conversations(self) -> Mapping[str, int]:
+        """Get DM conversations with message counts (read-only, shared until the next DM)."""
+        view = self._dm_counts_view
+        if view is None:
+            with self._dm_lock:
+                view = self._dm_counts_view
+                if view is None:
+                    view = self._dm_counts_view = MappingProxyType(dict(self._dm_counts))
+        return view
     
     # Game management
+    @staticmethod
+    def _index_add(index: Dict[str, dict], user_id: str, key) -> None:
+        index.setdefault(user_id, {})[key] = None
+
+    @staticmethod
+    def _index_discard(index: Dict[str, dict], user_id: str, key) -> None:
+        keys = index.get(user_id)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del index[user_id]
+
+    def _pop_ttt_invite(self, key: tuple) -> None:
+        if self._ttt_invites.pop(key, None) is not None:
+            self._index_discard(self._ttt_invites_by_user, key[0], key)
+            self._index_discard(self._ttt_invites_by_game, key[1], key)
+
     def add_ttt_invite(self, invite: TicTacToeInvite) -> None:
         """Add a Tic Tac Toe invite."""
-        with self._lock:
+        with self._games_lock:
             key = (invite.from_user, invite.game_id)
             self._ttt_invites[key] = invite
+            self._index_add(self._ttt_invites_by_user, invite.from_user, key)
+            self._index_add(self._ttt_invites_by_game, invite.game_id, key)
     
     def get_ttt_invite(self, from_user: str, game_id: str) -> Optional[TicTacToeInvite]:
         """Get a Tic Tac Toe invite."""
-        with self._lock:
-            return self._ttt_invites.get((from_user, game_id))
+        return self._ttt_invites.get((from_user, game_id))
     
     def remove_ttt_invite(self, from_user: str, game_id: str) -> None:
         """Remove a Tic Tac Toe invite."""
-        with self._lock:
-            key = (from_user, game_id)
-            self._ttt_invites.pop(key, None)
+        with self._games_lock:
+            self._pop_ttt_invite((from_user, game_id))
     
     def get_ttt_invites_for_user(self, user_id: str) -> List[TicTacToeInvite]:
         """Get all invites from a specific user."""
-        with self._lock:
-            return [invite for (from_user, _), invite in self._ttt_invites.items() 
-                   if from_user == user_id]
+        with self._games_lock:
+            return [self._ttt_invites[k] for k in self._ttt_invites_by_user.get(user_id, ())]
     
     def add_ttt_game(self, game: TicTacToeGame) -> None:
         """Add a Tic Tac Toe game."""
-        with self._lock:
+        with self._games_lock:
+            old = self._ttt_games.get(game.game_id)
+            if old is not None:
+                for uid in old.players.values():
+                    self._index_discard(self._ttt_games_by_user, uid, game.game_id)
             self._ttt_games[game.game_id] = game
+            for uid in game.players.values():
+                self._index_add(self._ttt_games_by_user, uid, game.game_id)
     
     def get_ttt_game(self, game_id: str) -> Optional[TicTacToeGame]:
         """Get a Tic Tac Toe game."""
-        with self._lock:
-            return self._ttt_games.get(game_id)
+        return self._ttt_games.get(game_id)
     
     def remove_ttt_game(self, game_id: str) -> None:
         """Remove a Tic Tac Toe game and any pending invites that reference it."""
-        with self._lock:
+        with self._games_lock:
             # Remove the game
-            self._ttt_games.pop(game_id, None)
+            game = self._ttt_games.pop(game_id, None)
+            if game is not None:
+                for uid in game.players.values():
+                    self._index_discard(self._ttt_games_by_user, uid, game_id)
 
             # Remove any invites with this game_id (keys are (from_user, game_id))
-            to_delete = [k for k in self._ttt_invites.keys() if k[1] == game_id]
-            for k in to_delete:
-                self._ttt_invites.pop(k, None)
+            for k in list(self._ttt_invites_by_game.get(game_id, ())):
+                self._pop_ttt_invite(k)
     
     def get_ttt_games_for_user(self, user_id: str) -> List[TicTacToeGame]:
         """Get all games involving a specific user."""
-        with self._lock:
-            return [game for game in self._ttt_games.values() 
-                   if user_id in game.players.values()]
+        with self._games_lock:
+            return [self._ttt_games[gid] for gid in self._ttt_games_by_user.get(user_id, ())]
     
     # Group management
     def add_group(self, group: Group) -> None:
         """Add a group."""
-        with self._lock:
+        with self._groups_lock:
+            old = self._groups.get(group.group_id)
+            if old is not None:
+                for uid in old.members:
+                    self._index_discard(self._groups_by_member, uid, group.group_id)
             self._groups[group.group_id] = group
+            for uid in group.members:
+                self._index_add(self._groups_by_member, uid, group.group_id)
             if group.group_id not in self._group_messages:
-                self._group_messages[group.group_id] = []
+                self._group_messages[group.group_id] = deque(maxlen=MAX_GROUP_HISTORY)
     
     def get_group(self, group_id: str) -> Optional[Group]:
         """Get a group by ID."""
-        with self._lock:
-            return self._groups.get(group_id)
+        return self._groups.get(group_id)
     
     def get_groups_for_user(self, user_id: str) -> List[Group]:
         """Get all groups that a user is a member of."""
-        with self._lock:
-            return [group for group in self._groups.values() if group.is_member(user_id)]
+        with self._groups_lock:
+            return [self._groups[gid] for gid in self._groups_by_member.get(user_id, ())]
     
     def remove_group(self, group_id: str) -> None:
         """Remove a group."""
-        with self._lock:
-            self._groups.pop(group_id, None)
+        with self._groups_lock:
+            group = self._groups.pop(group_id, None)
+            if group is not None:
+                for uid in group.members:
+                    self._index_discard(self._groups_by_member, uid, group_id)
             self._group_messages.pop(group_id, None)
+            self._group_snapshots.pop(group_id, None)
     
     def update_group_membership(self, group_id: str, add_members: List[str] = None, remove_members: List[str] = None) -> bool:
         """Update group membership."""
-        with self._lock:
+        with self._groups_lock:
             group = self._groups.get(group_id)
             if not group:
                 return False
@@ -361,65 +627,104 @@ class ApplicationState:
             if add_members:
                 for member in add_members:
                     group.add_member(member)
+                    self._index_add(self._groups_by_member, member, group_id)
             
             if remove_members:
                 for member in remove_members:
                     group.remove_member(member)
+                    self._index_discard(self._groups_by_member, member, group_id)
             
             return True
     
     def add_group_message(self, message: GroupMessage) -> None:
         """Add a group message."""
-        with self._lock:
-            if message.group_id not in self._group_messages:
-                self._group_messages[message.group_id] = []
-            self._group_messages[message.group_id].append(message)
-    
-    def get_group_messages(self, group_id: str) -> List[GroupMessage]:
-        """Get all messages for a group."""
-        with self._lock:
-            return self._group_messages.get(group_id, []).copy()
+        with self._groups_lock:
+            history = self._group_messages.get(message.group_id)
+            if history is None:
+                history = self._group_messages[message.group_id] = deque(maxlen=MAX_GROUP_HISTORY)
+            history.append(message)
+            self._group_snapshots.pop(message.group_id, None)
+    
+    def get_group_messages(self, group_id: str) -> Tuple[GroupMessage, ...]:
+        """Get the messages kept for a group (the last MAX_GROUP_HISTORY)."""
+        snapshot = self._group_snapshots.get(group_id)
+        if snapshot is None:
+            with self._groups_lock:
+                history = self._group_messages.get(group_id)
+                if not history:
+                    return ()
+                # Reused by every later call until the next message arrives
+                snapshot = self._group_snapshots[group_id] = tuple(history)
+        return snapshot
     
     def get_all_groups(self) -> List[Group]:
         """Get all groups."""
-        with self._lock:
+        with self._groups_lock:
             return list(self._groups.values())
     
     def mark_ack_pending(self, message_id: str) -> threading.Event:
         """Create/register an Event for this message_id ACK."""
         evt = threading.Event()
-        with self._lock:
+        with self._acks_lock:
             self._pending_acks[message_id] = evt
         return evt
 
     def resolve_ack(self, message_id: str) -> None:
         """Signal that ACK arrived for message_id (idempotent)."""
-        with self._lock:
+        with self._acks_lock:
             evt = self._pending_acks.pop(message_id, None)
         if evt:
             evt.set()
 
     def wait_for_ack(self, message_id: str, timeout: float) -> bool:
         """Block up to timeout waiting for the ACK Event."""
-        with self._lock:
+        with self._acks_lock:
             evt = self._pending_acks.get(message_id)
         return evt.wait(timeout) if evt else False
 
     def drop_ack_wait(self, message_id: str) -> None:
         """Remove pending ACK without setting it (cleanup after giving up)."""
-        with self._lock:
+        with self._acks_lock:
             self._pending_acks.pop(message_id, None)
     
     def notify_incoming_file_offer(self, fileid: str, offer: dict) -> None:
-        for cb in self._incoming_file_listeners:
-            try:
-                cb(fileid, offer)
-            except Exception:
-                pass
+        """Queue an offer for the registered listeners; returns without running them."""
+        if self._incoming_file_listeners:
+            self._file_offer_queue.put_nowait((fileid, offer))
 
     def register_incoming_file_listener(self, callback: Callable[[str, dict], None]):
         """Callback signature: fn(fileid: str, offer: dict)"""
-        self._incoming_file_listeners.append(callback)
+        with self._listeners_lock:
+            self._incoming_file_listeners += (callback,)
+            if self._file_offer_thread is None:
+                self._file_offer_thread = threading.Thread(
+                    target=self._dispatch_file_offers, name="lsnp-file-offers", daemon=True
+                )
+                self._file_offer_thread.start()
+
+    def stop_file_offer_dispatch(self) -> None:
+        """Let the dispatcher finish the offers already queued, then exit."""
+        if self._file_offer_thread is not None:
+            self._file_offer_queue.put_nowait(None)
+
+    def _dispatch_file_offers(self) -> None:
+        while True:
+            item = self._file_offer_queue.get()
+            if item is None:
+                return
+            fileid, offer = item
+            for cb in self._incoming_file_listeners:
+                try:
+                    cb(fileid, offer)
+                except Exception as e:
+                    failures = self._file_listener_failures.get(cb, 0) + 1
+                    self._file_listener_failures[cb] = failures
+                    if failures >= MAX_LISTENER_FAILURES:
+                        with self._listeners_lock:
+                            self._incoming_file_listeners = tuple(
+                                l for l in self._incoming_file_listeners if l is not cb)
+                        del self._file_listener_failures[cb]
+                        print(f"[FILE] Offer listener failed {failures} times, disabling it: {e}")
 
 # Global application state instance
 app_state = ApplicationState()
@@ -2,6 +2,7 @@
 from ..models.user import DirectMessage, Peer
 from ..network.client import NetworkManager
 from ..core.state import app_state
+from ..utils.console import ui_print
 
 
 class DmHandler:
@@ -25,21 +26,19 @@ class DmHandler:
 
         if not from_user or not content:
             if self.verbose:
-                print(f"[DEBUG] Invalid DM - missing FROM or CONTENT")
+                ui_print(f"[DEBUG] Invalid DM - missing FROM or CONTENT")
             return
 
         # Ignore DMs sent by yourself (to avoid double entry)
-        if app_state._local_user_id and from_user == app_state._local_user_id:
+        local_user_id = app_state._local_user_id
+        if local_user_id and from_user == local_user_id:
             return
 
         # Update sender's IP
         app_state.update_peer_ip(from_user, addr[0])
 
         # Get display name
-        peer = app_state.get_peer(from_user)
-        sender_display = peer.display_name if peer else (
-            from_user.split("@")[0] if "@" in from_user else from_user
-        )
+        sender_display = app_state.get_display_name(from_user)
 
         # Create DM object
         dm = DirectMessage(
@@ -51,17 +50,20 @@ class DmHandler:
             display_name=sender_display
         )
         
-        # Add to history
-        app_state.add_dm(dm)
+        # Add to history; a retransmit (our ACK was lost) is only ACKed again, not shown twice
+        if not app_state.add_dm(dm):
+            if message_id:
+                self.network_manager.send_ack(message_id, addr)
+            return
 
         # Display message
         active_dm_user = app_state.get_active_dm_user()
         if active_dm_user == from_user:
-            print(f"\n{sender_display}: {content}")
-            print(f"[You → {sender_display}]: ", end="", flush=True)
+            ui_print(f"\n{sender_display}: {content}")
+            ui_print(f"[You → {sender_display}]: ", end="")
         else:
-            print(f"\nNew message from {sender_display}: {content}")
-            print("> ", end="", flush=True)
+            ui_print(f"\nNew message from {sender_display}: {content}")
+            ui_print("> ", end="")
 
         # Send ACK if message has ID
         if message_id:
@@ -1,26 +1,33 @@
 # src/handlers/file_handler.py
 from typing import Tuple
 from ..core import state as core_state
+from ..utils.console import ui_print
 
 def handle_file_message(msg: dict, addr: Tuple[str,int]) -> None:
     app = core_state.app_state
     file_service = getattr(app, "file_service", None)
     if not file_service:
         if getattr(app, "verbose", False):
-            print("[FILE] No file service configured.")
+            ui_print("[FILE] No file service configured.")
         return
 
-    mtype = msg.get("TYPE", "")
-    if mtype == "FILE_OFFER":
-        file_service.handle_file_offer_incoming(msg, addr)
-    elif mtype == "FILE_ACCEPT":
-        file_service.handle_file_accept(msg, addr)
-    elif mtype == "FILE_REJECT":
-        fid = msg.get("FILEID")
-        if fid and fid in file_service.outgoing:
-            print(f"Remote rejected file offer {fid}")
-            file_service.outgoing.pop(fid, None)
-    elif mtype == "FILE_CHUNK":
-        file_service.handle_file_chunk_incoming(msg, addr)
-    elif mtype == "FILE_RECEIVED":
-        file_service.handle_file_received(msg, addr)
+    handler = _FILE_HANDLERS.get(msg.get("TYPE", ""))
+    if handler:
+        handler(file_service, msg, addr)
+
+
+def _handle_file_reject(file_service, msg: dict, addr: Tuple[str,int]) -> None:
+    fid = msg.get("FILEID")
+    if fid and fid in file_service.outgoing:
+        ui_print(f"Remote rejected file offer {fid}")
+        file_service.outgoing.pop(fid, None)
+
+
+# TYPE -> fn(file_service, msg, addr)
+_FILE_HANDLERS = {
+    "FILE_OFFER": lambda fs, msg, addr: fs.handle_file_offer_incoming(msg, addr),
+    "FILE_ACCEPT": lambda fs, msg, addr: fs.handle_file_accept(msg, addr),
+    "FILE_REJECT": _handle_file_reject,
+    "FILE_CHUNK": lambda fs, msg, addr: fs.handle_file_chunk_incoming(msg, addr),
+    "FILE_RECEIVED": lambda fs, msg, addr: fs.handle_file_received(msg, addr),
+}
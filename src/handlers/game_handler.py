@@ -5,6 +5,7 @@ from ..models.game import TicTacToeInvite, TicTacToeGame, Symbol, GameState
 from ..network.client import NetworkManager
 from ..network.protocol import build_message
 from ..core.state import app_state
+from ..utils.console import ui_print, ui_print_lazy
 
 
 class GameHandler:
@@ -43,15 +44,15 @@ class GameHandler:
             game_id=game_id,
             symbol=symbol,
             timestamp=float(msg.get("TIMESTAMP", time.time())),
-            message_id=msg.get("MESSAGE_ID",""),
+            message_id=mid or "",
             token=msg.get("TOKEN",""),
         )
         app_state.add_ttt_invite(invite)
 
         if self.verbose:
-            print("\n[GAME] You received a Tic-Tac-Toe invite!")
-            print(game.render_board())
-            print(f"[GAME] You will play as {other.value}.")
+            ui_print("\n[GAME] You received a Tic-Tac-Toe invite!")
+            ui_print_lazy(game.board_renderer())
+            ui_print(f"[GAME] You will play as {other.value}.")
 
     
     def handle_move(self, msg: dict, addr: tuple) -> None:
@@ -61,7 +62,7 @@ class GameHandler:
         if mid:
             self.network_manager.send_ack(mid, addr)
             if self.verbose:
-                print(f"[ACK] Sent ACK for move {mid} to {addr[0]}")
+                ui_print(f"[ACK] Sent ACK for move {mid} to {addr[0]}")
         
         from_user = msg.get("FROM")
         game_id = msg.get("GAMEID")
@@ -74,7 +75,7 @@ class GameHandler:
         # Map symbol string to enum
         if symbol_str not in ("X", "O"):
             if self.verbose:
-                print("[GAME] Invalid symbol in move")
+                ui_print("[GAME] Invalid symbol in move")
             return
         symbol = Symbol.X if symbol_str == "X" else Symbol.O
 
@@ -85,13 +86,13 @@ class GameHandler:
         game = app_state.get_ttt_game(game_id)
         if not game:
             if self.verbose:
-                print(f"[GAME] MOVE for unknown game {game_id}")
+                ui_print(f"[GAME] MOVE for unknown game {game_id}")
             return
 
         # Enforce turn and symbol ownership
         if game.next_symbol != symbol:
             if self.verbose:
-                print(f"[GAME] Out-of-turn move by {from_user} in {game_id}")
+                ui_print(f"[GAME] Out-of-turn move by {from_user} in {game_id}")
             return
 
         # Optional dedupe (by turn/pos/symbol)
@@ -103,23 +104,23 @@ class GameHandler:
         # Validate and apply move
         if not game.is_valid_move(position):
             if self.verbose:
-                print(f"[GAME] Invalid move {position} in {game_id}")
+                ui_print(f"[GAME] Invalid move {position} in {game_id}")
             return
 
         game.make_move(position, symbol)
         game.state = GameState.ACTIVE
 
         if self.verbose:
-            print(game.render_board())
-            print(f"[GAME] Next: {game.next_symbol.value}")
+            ui_print_lazy(game.board_renderer())
+            ui_print(f"[GAME] Next: {game.next_symbol.value}")
 
         if game.check_winner() or game.is_draw():
             game.state = GameState.FINISHED
             if self.verbose:
                 if game.is_draw():
-                    print(f"[GAME] DRAW in {game_id}")
+                    ui_print(f"[GAME] DRAW in {game_id}")
                 else:
-                    print(f"[GAME] {symbol.value} wins in {game_id}")
+                    ui_print(f"[GAME] {symbol.value} wins in {game_id}")
             app_state.remove_ttt_game(game_id)
     
     def handle_result(self, msg: dict, addr: tuple) -> None:
@@ -135,8 +136,8 @@ class GameHandler:
 
         # Show final board + message even if not verbose, so users actually see it.
         if game:
-            print(game.render_board())
-        print(f"[GAME] Result for {game_id}: {result}" + (f" (winner {symbol})" if result == "WIN" and symbol else ""))
+            ui_print_lazy(game.board_renderer())
+        ui_print(f"[GAME] Result for {game_id}: {result}" + (f" (winner {symbol})" if result == "WIN" and symbol else ""))
 
         # Mark finished & clean up (idempotent)
         if game:
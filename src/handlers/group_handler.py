@@ -5,6 +5,7 @@ from typing import List
 from ..models.group import Group, GroupMessage
 from ..network.client import NetworkManager
 from ..core.state import app_state
+from ..utils.console import ui_print
 
 
 class GroupHandler:
@@ -24,7 +25,7 @@ class GroupHandler:
         
         if not all([from_user, group_id, group_name]):
             if self.verbose:
-                print("GROUP_CREATE missing required fields")
+                ui_print("GROUP_CREATE missing required fields")
             return
         
         # Update sender's IP
@@ -48,7 +49,7 @@ class GroupHandler:
         app_state.add_group(group)
         
         if self.verbose:
-            print(f"GROUP_CREATE: {from_user} created group {group_name} ({group_id})")
+            ui_print(f"GROUP_CREATE: {from_user} created group {group_name} ({group_id})")
     
     def handle_group_update(self, msg: dict, addr: tuple) -> None:
         """Handle a GROUP_UPDATE message."""
@@ -59,7 +60,7 @@ class GroupHandler:
         
         if not all([from_user, group_id]):
             if self.verbose:
-                print("GROUP_UPDATE missing required fields")
+                ui_print("GROUP_UPDATE missing required fields")
             return
         
         # Update sender's IP
@@ -69,7 +70,7 @@ class GroupHandler:
         group = app_state.get_group(group_id)
         if not group:
             if self.verbose:
-                print(f"GROUP_UPDATE: Group {group_id} not found")
+                ui_print(f"GROUP_UPDATE: Group {group_id} not found")
             return
         
         # Parse member changes
@@ -86,11 +87,11 @@ class GroupHandler:
         app_state.update_group_membership(group_id, add_members, remove_members)
         
         if self.verbose:
-            print(f"GROUP_UPDATE: {from_user} updated group {group.group_name}")
+            ui_print(f"GROUP_UPDATE: {from_user} updated group {group.group_name}")
             if add_members:
-                print(f"  Added: {', '.join(add_members)}")
+                ui_print(f"  Added: {', '.join(add_members)}")
             if remove_members:
-                print(f"  Removed: {', '.join(remove_members)}")
+                ui_print(f"  Removed: {', '.join(remove_members)}")
     
     def handle_group_message(self, msg: dict, addr: tuple) -> None:
         """Handle a GROUP_MESSAGE message."""
@@ -101,7 +102,7 @@ class GroupHandler:
         
         if not all([from_user, group_id, content]):
             if self.verbose:
-                print("GROUP_MESSAGE missing required fields")
+                ui_print("GROUP_MESSAGE missing required fields")
             return
         
         # Update sender's IP
@@ -111,12 +112,11 @@ class GroupHandler:
         group = app_state.get_group(group_id)
         if not group:
             if self.verbose:
-                print(f"GROUP_MESSAGE: Group {group_id} not found")
+                ui_print(f"GROUP_MESSAGE: Group {group_id} not found")
             return
         
         # Get display name
-        peer = app_state.get_peer(from_user)
-        display_name = peer.display_name if peer else from_user.split("@")[0]
+        display_name = app_state.get_display_name(from_user)
         
         # Create group message
         group_message = GroupMessage(
@@ -131,4 +131,4 @@ class GroupHandler:
         app_state.add_group_message(group_message)
         
         if self.verbose:
-            print(f"GROUP_MESSAGE: {from_user} sent message to group {group.group_name}")
+            ui_print(f"GROUP_MESSAGE: {from_user} sent message to group {group.group_name}")
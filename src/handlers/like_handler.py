@@ -1,5 +1,6 @@
 """Handler for LIKE messages."""
 from ..core.state import app_state
+from ..utils.console import ui_print
 
 
 class LikeHandler:
@@ -17,32 +18,28 @@ class LikeHandler:
         
         if not from_user or not to_user or not post_id:
             if self.verbose:
-                print("LIKE missing required fields")
+                ui_print("LIKE missing required fields")
             return
         
         # Update sender's IP
         app_state.update_peer_ip(from_user, addr[0])
         
         # Find the post by MESSAGE_ID
-        post = None
-        for p in app_state.get_posts(False):
-            if p.message_id == post_id:
-                post = p
-                break
+        post = app_state.find_post_by_message_id(post_id)
         if not post:
             if self.verbose:
-                print(f"LIKE: Post not found for {to_user} with MESSAGE_ID {post_id}")
+                ui_print(f"LIKE: Post not found for {to_user} with MESSAGE_ID {post_id}")
             return
         
         # Apply like/unlike
         if action == "LIKE":
             post.add_like(from_user)
             if self.verbose:
-                print(f"LIKE: {from_user} liked post {post_id}")
+                ui_print(f"LIKE: {from_user} liked post {post_id}")
         elif action == "UNLIKE":
             post.remove_like(from_user)
             if self.verbose:
-                print(f"UNLIKE: {from_user} unliked post {post_id}")
+                ui_print(f"UNLIKE: {from_user} unliked post {post_id}")
         else:
             if self.verbose:
-                print(f"LIKE: Unknown action {action}")
+                ui_print(f"LIKE: Unknown action {action}")
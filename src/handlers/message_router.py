@@ -1,7 +1,7 @@
 """Message router for handling incoming messages."""
 from typing import Callable, Dict
-import time, uuid
-from ..network.protocol import build_message
+import time
+from ..network.protocol import build_message, new_message_id
 
 from .ping_handler import PingHandler
 from .profile_handler import ProfileHandler
@@ -15,6 +15,7 @@ from ..handlers.file_handler import handle_file_message
 
 from ..core.state import app_state
 from ..utils.auth import require_valid_token
+from ..utils.console import ui_print
 
 
 class MessageRouter:
@@ -60,6 +61,7 @@ class MessageRouter:
             "FOLLOW": lambda msg, addr: None,
             "UNFOLLOW": lambda msg, addr: None,
         }
+        self._dispatch = self.handlers.get  # bound once; route_message calls it per packet
     
     def route_message(self, msg: dict, addr: tuple) -> None:
         """Route incoming messages to appropriate handlers."""
@@ -71,7 +73,7 @@ class MessageRouter:
             if mid:
                 app_state.resolve_ack(mid)
                 if self.verbose:
-                    print(f"ACK received for {mid} from {addr[0]}")
+                    ui_print(f"ACK received for {mid} from {addr[0]}")
             return
         
         # Per-RFC auth: validate IP match + token scope/expiry/revocation per TYPE.
@@ -81,11 +83,11 @@ class MessageRouter:
             return
 
         # Route to appropriate handler
-        handler = self.handlers.get(mtype)
+        handler = self._dispatch(mtype)
         if handler:
             handler(msg, addr)
         elif self.verbose:
-            print(f"[ROUTER] Unhandled message type: {mtype}")
+            ui_print(f"[ROUTER] Unhandled message type: {mtype}")
 
     def _handle_ack(self, msg: dict, addr: tuple) -> None:
         """Handle incoming ACK messages."""
@@ -93,22 +95,22 @@ class MessageRouter:
         if mid:
             app_state.resolve_ack(mid)
             if self.verbose:
-                print(f"[ACK] Received ACK for {mid} from {addr[0]}:{addr[1]}")
+                ui_print(f"[ACK] Received ACK for {mid} from {addr[0]}:{addr[1]}")
         elif self.verbose:
-            print(f"[ACK] Received ACK without MESSAGE_ID from {addr[0]}:{addr[1]}")
+            ui_print(f"[ACK] Received ACK without MESSAGE_ID from {addr[0]}:{addr[1]}")
 
     def _handle_revoke(self, msg: dict, addr: tuple) -> None:
         """Handle token revocation broadcast."""
         tok = msg.get("TOKEN")
         if not tok:
             if self.verbose:
-                print("[REVOKE] Missing TOKEN")
+                ui_print("[REVOKE] Missing TOKEN")
             return
 
         parsed = app_state.parse_token(tok)
         if not parsed:
             if self.verbose:
-                print("[REVOKE] Malformed token string in REVOKE")
+                ui_print("[REVOKE] Malformed token string in REVOKE")
             return
 
         user_id, expiry, scope = parsed
@@ -119,13 +121,13 @@ class MessageRouter:
 
         if self.verbose:
             # Print REVOKE in detailed format
-            print(f"TYPE: REVOKE \nTOKEN: {tok}")
+            ui_print(f"TYPE: REVOKE \nTOKEN: {tok}")
 
     # Convenience: used elsewhere when the local user sends a POST
     def send_post(self, user, content: str, ttl: int = 3600) -> bool:
         now = int(time.time())
         exp = now + ttl
-        mid = uuid.uuid4().hex[:8]
+        mid = new_message_id()
 
         token = f"{user.user_id}|{exp}|broadcast"
         app_state.register_issued_token(token)  # so logout can REVOKE later
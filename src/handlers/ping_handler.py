@@ -1,8 +1,9 @@
 """Handler for PING messages."""
 import time
 
-from ..models.user import Peer
+from ..models.user import Peer, username_from_user_id, PEER_TIMEOUT, MAX_PEER_TIMEOUT
 from ..core.state import app_state
+from ..utils.console import ui_print
 
 
 class PingHandler:
@@ -16,7 +17,7 @@ class PingHandler:
         user_id = msg.get("USER_ID")
         if not user_id:
             if self.verbose:
-                print("PING missing USER_ID")
+                ui_print("PING missing USER_ID")
             return
         
         # Update peer table and IP mapping
@@ -31,13 +32,19 @@ class PingHandler:
             # Create new peer with minimal info
             peer = Peer(
                 user_id=user_id,
-                display_name=user_id.split("@")[0] if "@" in user_id else user_id,
+                display_name=username_from_user_id(user_id),
                 status="",
                 ip=addr[0],
                 last_seen=now
             )
         
+        # Senders with an adaptive interval say when to expect the next PING;
+        # allow one lost PING before the peer counts as inactive
+        next_ping_in = msg.get("NEXT_PING_IN")
+        if next_ping_in and next_ping_in.isdigit():
+            peer.timeout = min(max(PEER_TIMEOUT, 2 * int(next_ping_in)), MAX_PEER_TIMEOUT)
+        
         app_state.add_peer(peer)
         
         if self.verbose:
-            print(f"PING from {user_id} at {addr[0]}")
+            ui_print(f"PING from {user_id} at {addr[0]}")
@@ -4,6 +4,7 @@ import time
 from ..models.user import Post
 from ..core.state import app_state
 from ..utils.dedupe import seen_before
+from ..utils.console import ui_print
 
 
 class PostHandler:
@@ -29,7 +30,7 @@ class PostHandler:
         # Basic sanity
         if not user_id or not content:
             if self.verbose:
-                print("[POST] DROP malformed POST (missing USER_ID or CONTENT)")
+                ui_print("[POST] DROP malformed POST (missing USER_ID or CONTENT)")
             return
 
         # TTL present on POST; default 3600
@@ -44,12 +45,11 @@ class PostHandler:
         # Optional TTL drop at receive time (usually won't drop immediately)
         if ts + ttl < int(time.time()):
             if self.verbose:
-                print(f"[POST] DROP expired POST (mid={mid}) from {user_id}")
+                ui_print(f"[POST] DROP expired POST (mid={mid}) from {user_id}")
             return
 
         # Resolve display name if we know this peer
-        peer = app_state.get_peer(user_id)
-        display_name = peer.display_name if peer else (user_id.split("@")[0] or user_id)
+        display_name = app_state.get_display_name(user_id)
 
         # Persist; follower filtering happens when reading from state (get_posts)
         app_state.add_post(Post(
@@ -64,7 +64,7 @@ class PostHandler:
 
         if self.verbose:
             # Print POST message in detailed format
-            print(
+            ui_print(
                 f"TYPE: POST USER_ID: {user_id} \n"
                 f"CONTENT: {content} \n"
                 f"TTL: {ttl} \n"
@@ -1,8 +1,9 @@
 """Handler for PROFILE messages."""
 import time
 
-from ..models.user import Peer
+from ..models.user import Peer, PEER_TIMEOUT
 from ..core.state import app_state
+from ..utils.console import ui_print
 
 
 class ProfileHandler:
@@ -19,19 +20,21 @@ class ProfileHandler:
         
         if not user_id:
             if self.verbose:
-                print("PROFILE missing USER_ID")
+                ui_print("PROFILE missing USER_ID")
             return
         
-        # Create or update peer
+        # Create or update peer, keeping any timeout learned from its PINGs
+        existing = app_state.get_peer(user_id)
         peer = Peer(
             user_id=user_id,
             display_name=display_name,
             status=status,
             ip=addr[0],
-            last_seen=time.time()
+            last_seen=time.time(),
+            timeout=existing.timeout if existing else PEER_TIMEOUT
         )
         
         app_state.add_peer(peer)
         
         if self.verbose:
-            print(f"PROFILE from {display_name} ({user_id}) at {addr[0]}")
+            ui_print(f"PROFILE from {display_name} ({user_id}) at {addr[0]}")
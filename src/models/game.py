@@ -1,6 +1,7 @@
 """Game models for Tic Tac Toe."""
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set
 from enum import Enum
 
 
@@ -30,16 +31,56 @@ class TicTacToeInvite:
     token: str
 
 
+# Winning lines as cell tuples and as 9-bit masks (bit i = cell i)
+WIN_LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # columns
+    (0, 4, 8), (2, 4, 6),             # diagonals
+)
+WIN_MASKS = tuple(sum(1 << i for i in line) for line in WIN_LINES)
+FULL_BOARD = 0b111111111
+
+
+def render_board(x_mask: int, o_mask: int) -> str:
+    """Render a board with numbers for empty cells and symbols where taken."""
+    def cell_char(i: int) -> str:
+        bit = 1 << i
+        return "X" if x_mask & bit else "O" if o_mask & bit else str(i)
+
+    return f"""
+    {cell_char(0)} | {cell_char(1)} | {cell_char(2)}
+    -----------
+    {cell_char(3)} | {cell_char(4)} | {cell_char(5)}
+    -----------
+    {cell_char(6)} | {cell_char(7)} | {cell_char(8)}
+    """
+
+
 @dataclass
 class TicTacToeGame:
     """Represents a Tic Tac Toe game."""
     game_id: str
-    board: List[Symbol] = field(default_factory=lambda: [Symbol.EMPTY] * 9)
+    # Each player's cells as a 9-bit mask; bit i set means that symbol holds cell i
+    x_mask: int = 0
+    o_mask: int = 0
     players: Dict[Symbol, str] = field(default_factory=dict)
     next_symbol: Symbol = Symbol.X
     turn: int = 1
     moves_seen: Set[str] = field(default_factory=set)
     state: GameState = GameState.PENDING
+
+    @property
+    def board(self) -> List[Symbol]:
+        """The board as a list of 9 symbols."""
+        return [self._cell(i) for i in range(9)]
+
+    def _cell(self, i: int) -> Symbol:
+        bit = 1 << i
+        if self.x_mask & bit:
+            return Symbol.X
+        if self.o_mask & bit:
+            return Symbol.O
+        return Symbol.EMPTY
     
     def get_player_symbol(self, user_id: str) -> Optional[Symbol]:
         """Get the symbol for a given player."""
@@ -57,36 +98,40 @@ class TicTacToeGame:
     
     def is_valid_move(self, position: int) -> bool:
         """Check if a move is valid."""
-        return 0 <= position <= 8 and self.board[position] == Symbol.EMPTY
+        return 0 <= position <= 8 and not (self.x_mask | self.o_mask) & (1 << position)
     
     def make_move(self, position: int, symbol: Symbol) -> bool:
         """Make a move on the board."""
         if not self.is_valid_move(position):
             return False
         
-        self.board[position] = symbol
+        if symbol == Symbol.X:
+            self.x_mask |= 1 << position
+        else:
+            self.o_mask |= 1 << position
         self.next_symbol = Symbol.O if symbol == Symbol.X else Symbol.X
         self.turn += 1
         return True
+
+    def winning_line(self) -> Optional[tuple]:
+        """The winning line's cells, or None if nobody has won."""
+        for line, w in zip(WIN_LINES, WIN_MASKS):
+            if self.x_mask & w == w or self.o_mask & w == w:
+                return line
+        return None
     
     def check_winner(self) -> Optional[Symbol]:
         """Check if there's a winner."""
-        # Winning combinations
-        wins = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]               # diagonals
-        ]
-        
-        for combo in wins:
-            symbols = [self.board[i] for i in combo]
-            if symbols[0] != Symbol.EMPTY and all(s == symbols[0] for s in symbols):
-                return symbols[0]
+        for w in WIN_MASKS:
+            if self.x_mask & w == w:
+                return Symbol.X
+            if self.o_mask & w == w:
+                return Symbol.O
         return None
     
     def is_draw(self) -> bool:
         """Check if the game is a draw."""
-        return all(cell != Symbol.EMPTY for cell in self.board) and self.check_winner() is None
+        return (self.x_mask | self.o_mask) == FULL_BOARD and self.check_winner() is None
     
     def is_game_over(self) -> bool:
         """Check if the game is over."""
@@ -94,13 +139,8 @@ class TicTacToeGame:
 
     def render_board(self) -> str:
         """Render the board with numbers for empty cells and symbols where taken."""
-        def cell_char(i: int) -> str:
-            return self.board[i].value if self.board[i] != Symbol.EMPTY else str(i)
+        return render_board(self.x_mask, self.o_mask)
 
-        return f"""
-    {cell_char(0)} | {cell_char(1)} | {cell_char(2)}
-    -----------
-    {cell_char(3)} | {cell_char(4)} | {cell_char(5)}
-    -----------
-    {cell_char(6)} | {cell_char(7)} | {cell_char(8)}
-    """
+    def board_renderer(self) -> Callable[[], str]:
+        """render_board() of the board as it is now, for rendering later (e.g. on the console thread)."""
+        return partial(render_board, self.x_mask, self.o_mask)
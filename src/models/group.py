@@ -3,6 +3,8 @@ from dataclasses import dataclass, field
 from typing import Set, Optional
 import time
 
+from .user import username_from_user_id
+
 
 @dataclass
 class Group:
@@ -46,5 +48,5 @@ class GroupMessage:
     
     def format_for_display(self) -> str:
         """Format message for display."""
-        sender_name = self.display_name or self.from_user.split("@")[0]
+        sender_name = self.display_name or username_from_user_id(self.from_user)
         return f"{sender_name}: {self.content}"
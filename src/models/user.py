@@ -1,8 +1,19 @@
 """User model and related data structures."""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Optional
+import sys
 import time
 
+PEER_TIMEOUT = 60  # seconds without a PING/PROFILE before a peer counts as inactive
+MAX_PEER_TIMEOUT = 900  # upper bound on a peer-advertised timeout (see NEXT_PING_IN)
+
+
+@lru_cache(maxsize=1024)
+def username_from_user_id(user_id: str) -> str:
+    """Fallback display name for user_id (the part before '@'), memoized per ID."""
+    return user_id.partition("@")[0] or user_id
+
 
 @dataclass
 class User:
@@ -29,11 +40,18 @@ class Peer:
     status: str
     ip: str
     last_seen: float
+    # Seconds of silence before the peer counts as inactive; widened when it
+    # advertises a longer ping interval via NEXT_PING_IN
+    timeout: float = PEER_TIMEOUT
+
+    def __post_init__(self):
+        # Peer IDs end up as keys in several sets/dicts; interning makes those lookups identity compares
+        self.user_id = sys.intern(self.user_id)
     
     @property
     def is_active(self) -> bool:
-        """Check if peer has been seen recently (within 60 seconds)."""
-        return time.time() - self.last_seen < 60
+        """Check if peer has been seen recently (within its timeout)."""
+        return time.time() - self.last_seen < self.timeout
     
     @property
     def seconds_since_seen(self) -> int:
@@ -66,6 +84,12 @@ class Post:
     message_id: str
     likes: set
     ttl: int = 3600
+    likes_count: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        self.user_id = sys.intern(self.user_id)
+        self.likes = {sys.intern(uid) for uid in self.likes}
+        self.likes_count = len(self.likes)
     
     @property
     def age_seconds(self) -> int:
@@ -75,15 +99,19 @@ class Post:
     @property
     def like_count(self) -> int:
         """Get number of likes."""
-        return len(self.likes)
+        return self.likes_count
     
     def add_like(self, user_id: str) -> None:
         """Add a like from a user."""
-        self.likes.add(user_id)
+        if user_id not in self.likes:
+            self.likes.add(sys.intern(user_id))
+            self.likes_count += 1
     
     def remove_like(self, user_id: str) -> None:
         """Remove a like from a user."""
-        self.likes.discard(user_id)
+        if user_id in self.likes:
+            self.likes.discard(user_id)
+            self.likes_count -= 1
     
     def has_liked(self, user_id: str) -> bool:
         """Check if user has liked this post."""
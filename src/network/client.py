@@ -1,14 +1,30 @@
 """Network communication utilities."""
+import os
 import socket
 import re
+import threading
 import time
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
-from .protocol import build_message
+from .protocol import build_message, build_message_into
+from .udp_batch import Coalescer
 from ..core.state import app_state
+from ..utils.console import ui_print
 from .protocol import parse_message
 
 PORT = 50999
+LIMITED_BROADCAST = "255.255.255.255"
+# Send to both the subnet and the limited broadcast address (for networks that need it)
+DUAL_BROADCAST = os.environ.get("LSNP_DUAL_BROADCAST") == "1"
+# os.write() on a socket fd only works where sockets are file descriptors
+FD_WRITE = os.name == "posix"
+_IPV4_RE = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}$")
+BROADCAST_IP_TTL = 300  # seconds before the cached broadcast address is recomputed
+SEND_BUFFER_SIZE = 1 << 20  # SO_SNDBUF for the shared socket, so fan-out bursts don't stall sendto
+PEER_SOCKET_SWEEP = 60  # seconds between closing connected sockets for IPs no active peer uses
+
+_bcast_cache = {"ip": None, "expires": 0.0}
 
 
 def get_local_ip() -> str:
@@ -31,26 +47,133 @@ def get_broadcast_ip() -> str:
         parts[-1] = "255"
         return ".".join(parts)
     except Exception:
-        return "255.255.255.255"
+        return LIMITED_BROADCAST
+
+
+def cached_broadcast_ip() -> str:
+    """get_broadcast_ip(), recomputed at most every BROADCAST_IP_TTL seconds."""
+    now = time.monotonic()
+    if _bcast_cache["ip"] is None or now >= _bcast_cache["expires"]:
+        _bcast_cache["ip"] = get_broadcast_ip()
+        _bcast_cache["expires"] = now + BROADCAST_IP_TTL
+    return _bcast_cache["ip"]
 
 
+@lru_cache(maxsize=1024)
 def extract_ip_from_user_id(user_id: str) -> Optional[str]:
     """Extract IPv4 address from user_id format (username@ip)."""
-    if "@" not in user_id:
+    _, sep, ip = user_id.partition("@")
+    if not sep:
         return None
-    ip = user_id.split("@", 1)[1].strip()
-    return ip if re.match(r"^\d{1,3}(\.\d{1,3}){3}$", ip) else None
+    ip = ip.strip()
+    return ip if _IPV4_RE.match(ip) else None
 
 
 class NetworkManager:
     """Manages network communication."""
     
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, broadcast_resolver: Callable[[], str] = cached_broadcast_ip):
         self.verbose = verbose
+        # Returns the subnet broadcast address; injectable for tests or fixed setups
+        self._broadcast_resolver = broadcast_resolver
+        # Connected UDP sockets (and their fds) keyed by peer IP
+        self._peer_socks: Dict[str, Tuple[socket.socket, int]] = {}
+        self._peer_socks_lock = threading.Lock()
+        # Dropped by the last sweep; closed by the next one, once no send can still hold their fd
+        self._retired_socks: List[socket.socket] = []
+        # Shared broadcast socket, created on first use
+        self._bcast_sock: Optional[socket.socket] = None
+        self._bcast_lock = threading.Lock()
+        # Broadcasts (and queued unicasts) go out on the shared socket, batched under back-pressure
+        self._coalescer = Coalescer(self._get_bcast_sock, self._on_send_error, lambda: self.verbose,
+                                    self._send_one)
+        # (subnet ip, destination tuples) so each broadcast reuses the same address tuples
+        self._bcast_addrs: Tuple[Optional[str], Tuple[Tuple[str, int], ...]] = (None, ())
+        # Per-thread scratch buffers for synchronous sends
+        self._tls = threading.local()
+    
+    def _get_bcast_sock(self) -> socket.socket:
+        """Return the shared SO_BROADCAST socket, creating it on first use."""
+        if self._bcast_sock is None:
+            with self._bcast_lock:
+                if self._bcast_sock is None:
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                    try:
+                        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE)
+                    except OSError:
+                        pass  # the kernel clamps or refuses it; the default buffer still works
+                    self._bcast_sock = sock
+        return self._bcast_sock
+    
+    def _peer_socket(self, ip: str) -> Tuple[socket.socket, int]:
+        """Return a UDP socket connected to (ip, PORT), creating it on first use."""
+        entry = self._peer_socks.get(ip)
+        if entry is None:
+            with self._peer_socks_lock:
+                entry = self._peer_socks.get(ip)
+                if entry is None:
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    # Also lets a socket connected to a broadcast address send
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                    sock.connect((ip, PORT))
+                    entry = (sock, sock.fileno())
+                    self._peer_socks[ip] = entry
+        return entry
     
-    def _auto_register_token(self, message: str) -> None:
+    def prune_peer_sockets(self) -> None:
+        """Drop connected sockets for IPs that no active peer (or broadcast address) uses any more."""
+        keep = {peer.ip for peer in app_state.get_active_peers()}
+        keep.update(ip for ip, _ in self._broadcast_addrs())
+        with self._peer_socks_lock:
+            retired, self._retired_socks = self._retired_socks, []
+            for ip in [ip for ip in self._peer_socks if ip not in keep]:
+                self._retired_socks.append(self._peer_socks.pop(ip)[0])
+        for sock in retired:
+            sock.close()
+        if self.verbose and self._retired_socks:
+            print(f"[DEBUG] Dropped {len(self._retired_socks)} unused peer socket(s)")
+
+    def close(self) -> None:
+        """Close every socket opened for sending; call flush() first."""
+        with self._peer_socks_lock:
+            socks = [sock for sock, _ in self._peer_socks.values()] + self._retired_socks
+            self._peer_socks = {}
+            self._retired_socks = []
+        with self._bcast_lock:
+            if self._bcast_sock is not None:
+                socks.append(self._bcast_sock)
+                self._bcast_sock = None
+        for sock in socks:
+            sock.close()
+
+    def _send_connected(self, ip: str, data: bytes) -> None:
+        """Send on the connected socket for ip, writing straight to its fd when possible."""
+        sock, fd = self._peer_socket(ip)
+        if FD_WRITE:
+            try:
+                os.write(fd, data)
+                return
+            except (BlockingIOError, InterruptedError, ConnectionRefusedError):
+                # Busy buffer, signal, or a stale ICMP error from an earlier send: retry below
+                pass
+        sock.send(data)
+    
+    def _send_one(self, data: bytes, addr: Tuple[str, int]) -> None:
+        """Coalescer hook for a lone datagram: use the connected socket so the kernel skips the route lookup."""
+        if addr[1] == PORT:
+            self._send_connected(addr[0], data)
+        else:
+            self._get_bcast_sock().sendto(data, addr)
+    
+    def _auto_register_token(self, message: Union[str, bytes]) -> None:
         """Parse outgoing message and remember its TOKEN for later revoke."""
         try:
+            if isinstance(message, bytes):
+                if b"TOKEN: " not in message:
+                    return
+                message = message.decode("utf-8")
             fields = parse_message(message)
             tok = fields.get("TOKEN")
             if tok:
@@ -58,48 +181,120 @@ class NetworkManager:
         except Exception:
             pass
     
-    def send_unicast(self, message: str, user_id: str) -> bool:
-        """Send a unicast message to a specific user."""
+    def _resolve_ip(self, user_id: str, message: Union[str, bytes]) -> Optional[str]:
+        """Find the IP for user_id from the peer table, falling back to the @ip in the UID."""
         ip = app_state.get_peer_ip(user_id)
-        if not ip:
-            ip = extract_ip_from_user_id(user_id)
-            if self.verbose and ip:
-                print("\n\nvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv\n\n" + message + "^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^\n\n")
-                print(f"[DEBUG] Using IP parsed from UID ({user_id}) -> {ip}")
+        if ip:
+            return ip
+        # Only the fallback paths below print the message
+        if self.verbose and isinstance(message, bytes):
+            message = message.decode("utf-8")
+        ip = extract_ip_from_user_id(user_id)
+        if self.verbose and ip:
+            print("\n\nvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv\n\n" + message + "^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^\n\n")
+            print(f"[DEBUG] Using IP parsed from UID ({user_id}) -> {ip}")
         
         if not ip:
             if self.verbose:
                 print("\n\nvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv\n\n" + message + "^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^\n\n")
                 print(f"[DEBUG] No IP mapping and no @IP in UID for {user_id}")
-            return False
+        return ip
+    
+    def resolve(self, user_id: str, message: Union[str, bytes] = "") -> Optional[Tuple[str, int]]:
+        """Destination address for user_id, or None. Resolve once and reuse it with send_to()."""
+        ip = self._resolve_ip(user_id, message)
+        return (ip, PORT) if ip else None
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    def send_to(self, data: bytes, addr: Tuple[str, int]) -> bool:
+        """
+        Send already-encoded bytes to an address from resolve().
+        Unlike send_unicast, this doesn't record the message's TOKEN.
+        """
         try:
-            self._auto_register_token(message)
-            sock.sendto(message.encode("utf-8"), (ip, PORT))
+            self._send_connected(addr[0], data)
             return True
         except Exception as e:
-            print(f"Failed to send to {user_id} ({ip}): {e}")
+            print(f"Failed to send to {addr[0]}: {e}")
             return False
-        finally:
-            sock.close()
+
+    def send_unicast(self, message: Union[str, bytes], user_id: str) -> bool:
+        """Send a unicast message (str, or bytes already encoded as UTF-8) to a specific user."""
+        addr = self.resolve(user_id, message)
+        if not addr:
+            return False
+        data = message.encode("utf-8") if isinstance(message, str) else message
+        self._auto_register_token(data)
+        return self.send_to(data, addr)
+
+    def send_unicast_many(self, message: Union[str, bytes], user_ids: List[str]) -> bool:
+        """Send one message to several users, encoding it and recording its token once."""
+        data = message.encode("utf-8") if isinstance(message, str) else message
+        self._auto_register_token(data)
+        success = True
+        for user_id in user_ids:
+            addr = self.resolve(user_id, message)
+            if not addr or not self.send_to(data, addr):
+                success = False
+        return success
     
-    def send_broadcast(self, message: str) -> None:
-        """Send a broadcast message."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        
-        # Try both subnet and limited broadcast
-        broadcast_addresses = {get_broadcast_ip(), "255.255.255.255"}
-        
-        for bcast in broadcast_addresses:
+    def send_broadcast(self, message: Union[str, bytes]) -> None:
+        """Send a broadcast message (str, or bytes already encoded as UTF-8)."""
+        data = message.encode("utf-8") if isinstance(message, str) else message
+        self._auto_register_token(data)
+        for addr in self._broadcast_addrs():
+            self._coalescer.enqueue(data, addr)
+    
+    def flush(self) -> None:
+        """Send any queued datagrams now (e.g. before exiting)."""
+        self._coalescer.flush()
+
+    def batch(self):
+        """Context manager: broadcasts/queued sends inside the block leave in one sendmmsg call."""
+        return self._coalescer.hold()
+    
+    def _on_send_error(self, data: bytes, addr: Tuple[str, int], err: OSError) -> None:
+        """Report a failed queued send; a failed subnet broadcast falls back to the limited one."""
+        print(f"Send to {addr[0]} failed: {err}")
+        failed = getattr(self._tls, "failed", None)
+        if failed is not None:
+            failed.append(addr)
+        if addr[0] != LIMITED_BROADCAST and addr[0] == self._broadcast_resolver():
             try:
-                self._auto_register_token(message)
-                sock.sendto(message.encode("utf-8"), (bcast, PORT))
-            except Exception as e:
-                print(f"Broadcast to {bcast} failed: {e}")
-        
-        sock.close()
+                self._get_bcast_sock().sendto(data, (LIMITED_BROADCAST, PORT))
+            except OSError as e:
+                print(f"Broadcast to {LIMITED_BROADCAST} failed: {e}")
+    
+    def _broadcast_addrs(self) -> Tuple[Tuple[str, int], ...]:
+        """Subnet broadcast, plus the limited broadcast when DUAL_BROADCAST is set."""
+        subnet = self._broadcast_resolver()
+        cached = self._bcast_addrs
+        if cached[0] != subnet:
+            if DUAL_BROADCAST and subnet != LIMITED_BROADCAST:
+                addrs = ((subnet, PORT), (LIMITED_BROADCAST, PORT))
+            else:
+                addrs = ((subnet, PORT),)
+            cached = self._bcast_addrs = (subnet, addrs)
+        return cached[1]
+    
+    def send_unicast_and_broadcast(self, message: Union[str, bytes], user_id: str) -> bool:
+        """
+        Queue a message for user_id and the broadcast address(es) so they go out in one batch.
+        Returns False if user_id can't be resolved or the unicast copy fails to send. Inside an
+        enclosing batch(), or while another thread is flushing, the copies leave later and only
+        the resolve is checked here.
+        """
+        data = message.encode("utf-8") if isinstance(message, str) else message
+        addr = self.resolve(user_id, message)
+        # _on_send_error records failed destinations here while this thread flushes the batch
+        failed = self._tls.failed = []
+        try:
+            with self.batch():
+                if addr:
+                    self._coalescer.enqueue(data, addr)
+                self.send_broadcast(data)  # also records the TOKEN
+        finally:
+            self._tls.failed = None
+        return addr is not None and addr not in failed
     
     def send_ack(self, message_id: str, addr: tuple) -> None:
         """
@@ -114,17 +309,19 @@ class NetworkManager:
             "MESSAGE_ID": message_id,
             "STATUS": "RECEIVED",
         }
-        ack_msg = build_message(ack_fields)
+        # ACKs go out synchronously, so each sending thread can reuse one buffer
+        buf = getattr(self._tls, "ack_buf", None)
+        if buf is None:
+            buf = self._tls.ack_buf = bytearray()
+        build_message_into(buf, ack_fields)
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         try:
-            # Force destination to (peer_ip, 50999) instead of the source port.
-            sock.sendto(ack_msg.encode("utf-8"), (addr[0], PORT))
+            # Reuses the peer's connected socket, which targets (peer_ip, 50999)
+            # rather than the source port.
+            self._send_connected(addr[0], buf)
             if self.verbose:
-                print("\n\nvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv\n\n" + ack_msg + "^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^\n\n")
-                print(f"Sent ACK for {message_id} to {addr}")
+                ui_print("\n\nvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv\n\n" + buf.decode("utf-8") + "^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^\n\n")
+                ui_print(f"Sent ACK for {message_id} to {addr}")
         except Exception as e:
             if self.verbose:
-                print(f"Failed to send ACK: {e}")
-        finally:
-            sock.close()
\ No newline at end of file
+                ui_print(f"Failed to send ACK: {e}")
\ No newline at end of file
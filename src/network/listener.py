@@ -1,29 +1,162 @@
 """UDP listener for incoming messages."""
+import asyncio
+import heapq
+import itertools
+import os
 import socket
+import sys
+import threading
 import time
-from typing import Callable
+from typing import Callable, List, Optional
 
 from .protocol import parse_message
+from .udp_batch import RecvBatch, RECVMMSG_SUPPORTED
+from ..utils.console import ui_print
+
+try:
+    import uvloop  # optional: faster libuv-based event loop (not available on Windows)
+    new_event_loop = uvloop.new_event_loop
+except ImportError:
+    new_event_loop = asyncio.new_event_loop
 
 
 PORT = 50999
 BUFFER_SIZE = 65535
 LISTEN_IP = ''
 
+# Extra receive threads sharing the port via SO_REUSEPORT (Linux only; opt-in).
+# The kernel load-balances unicast across them; broadcasts still reach every
+# socket in the group, so only worker 0 handles those.
+REUSEPORT_SUPPORTED = sys.platform.startswith("linux") and hasattr(socket, "SO_REUSEPORT")
+try:
+    LISTENER_WORKERS = max(1, int(os.environ.get("LSNP_LISTENERS", "1"))) if REUSEPORT_SUPPORTED else 1
+except ValueError:
+    LISTENER_WORKERS = 1
+IP_PKTINFO = getattr(socket, "IP_PKTINFO", 8)  # Linux value; not exported by every Python build
+_PKTINFO_SPACE = socket.CMSG_SPACE(12) if hasattr(socket, "CMSG_SPACE") else 0
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """Feeds datagrams from the event loop's UDP endpoint into a UDPListener."""
+
+    def __init__(self, listener: "UDPListener"):
+        self.listener = listener
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        self.listener._dispatch(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        if self.listener.verbose:
+            ui_print(f"Receive error: {exc}")
+
 
 class UDPListener:
-    """UDP message listener."""
+    """UDP message listener, run as an asyncio event loop on its own thread."""
     
-    def __init__(self, message_router: Callable[[dict, tuple], None], verbose: bool = False):
+    def __init__(self, message_router: Callable[[dict, tuple], None], verbose: bool = False,
+                 worker_index: int = 0, reuse_port: bool = False):
         self.message_router = message_router
         self.verbose = verbose
+        # Worker 0 owns the timers and broadcasts; higher workers only take unicast
+        self.worker_index = worker_index
+        self.reuse_port = reuse_port
         self.running = False
+        self._stop_requested = threading.Event()  # set by stop(), also cuts bind retries short
+        # Set once the socket is bound and the loop is receiving (or start() gave up)
+        self.ready = threading.Event()
+
+        # Periodic callbacks run on the listener loop: heap of [due, seq, interval, callback]
+        self._timers: List[list] = []
+        self._timer_seq = itertools.count()
+        self._timer_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer_handle: Optional[asyncio.TimerHandle] = None  # loop callback for the earliest timer
+        self._stopped: Optional[asyncio.Future] = None
+
+    def call_every(self, interval: float, callback: Callable[[], None], first_delay: float = 0.0) -> list:
+        """Run callback every `interval` seconds on the listener loop. Returns a handle for cancel()."""
+        entry = [time.monotonic() + first_delay, next(self._timer_seq), interval, callback]
+        with self._timer_lock:
+            heapq.heappush(self._timers, entry)
+        self._wake()
+        return entry
+
+    def set_interval(self, handle: list, interval: float) -> None:
+        """Change a call_every() timer's interval; the pending run moves by the difference."""
+        with self._timer_lock:
+            handle[0] += interval - handle[2]
+            handle[2] = interval
+            heapq.heapify(self._timers)
+        self._wake()
+
+    def next_due(self, handle: list) -> float:
+        """time.monotonic() value at which a call_every() timer next runs."""
+        return handle[0]
+
+    def cancel(self, handle: list) -> None:
+        """Cancel a periodic callback registered with call_every()."""
+        handle[3] = None  # lazily dropped when it reaches the top of the heap
+
+    def _wake(self) -> None:
+        """Have the loop re-arm its timer callback after the heap changed (any thread)."""
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._arm_timers)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _arm_timers(self) -> None:
+        """Schedule one loop callback for the earliest live timer. Runs on the loop."""
+        if self._timer_handle is not None:
+            self._timer_handle.cancel()
+            self._timer_handle = None
+        with self._timer_lock:
+            while self._timers and self._timers[0][3] is None:
+                heapq.heappop(self._timers)
+            if not self._timers:
+                return
+            delay = self._timers[0][0] - time.monotonic()
+        self._timer_handle = self._loop.call_later(max(delay, 0.0), self._on_timers)
+
+    def _on_timers(self) -> None:
+        self._timer_handle = None
+        self._run_due_timers()
+        self._arm_timers()
+
+    def _run_due_timers(self) -> None:
+        """Run every timer whose due time has passed and reschedule it."""
+        now = time.monotonic()
+        due = []
+        with self._timer_lock:
+            while self._timers and self._timers[0][0] <= now:
+                entry = heapq.heappop(self._timers)
+                if entry[3] is None:
+                    continue
+                due.append(entry)
+        for entry in due:
+            callback = entry[3]
+            if callback is None:
+                continue
+            try:
+                callback()
+            except Exception as e:
+                if self.verbose:
+                    print(f"Timer callback error: {e}")
+            entry[0] = now + entry[2]
+            with self._timer_lock:
+                heapq.heappush(self._timers, entry)
     
     def start(self) -> None:
-        """Start the UDP listener."""
+        """Bind the UDP socket and run the listener's event loop until stop()."""
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)  # receive broadcasts
+        if self.reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if self.worker_index:
+            # Need each datagram's destination address to tell broadcasts apart
+            sock.setsockopt(socket.IPPROTO_IP, IP_PKTINFO, 1)
 
         # Bind with simple retry
         for retry in range(5):
@@ -33,65 +166,137 @@ class UDPListener:
             except OSError as e:
                 if retry == 4:
                     print(f"Failed to bind to port {PORT} after 5 attempts: {e}")
+                    sock.close()
+                    self.ready.set()
                     return
                 print(f"Retry {retry + 1}: Failed to bind to port {PORT}, retrying in 1 second...")
-                time.sleep(1)
+                if self._stop_requested.wait(1):
+                    sock.close()
+                    self.ready.set()
+                    return
 
-        print(f"Listening on UDP port {PORT}")
-        self.running = True
+        if not self.worker_index:
+            print(f"Listening on UDP port {PORT}")
+        sock.setblocking(False)
 
+        loop = new_event_loop()
         try:
-            while self.running:
-                try:
-                    data, addr = sock.recvfrom(BUFFER_SIZE)
-                    raw = data.decode("utf-8", errors="ignore")
-                except Exception as e:
-                    if self.verbose:
-                        print(f"Receive error: {e}")
-                    continue
-
-                msg = parse_message(raw)
-                if not msg:
-                    if self.verbose:
-                        print(f"DROP! Invalid or unterminated message from {addr}.")
-                    continue
-
-                if self.verbose:
-                    t = time.strftime("%H:%M:%S")
-                    file_types = (
-                        'FILE_OFFER', 'FILE_CHUNK', 'FILE_RECEIVED', 'FILE_ACCEPT', 'FILE_REJECT'
-                    )
-                    msg_type = msg.get('TYPE', '?')
-                    if msg_type in file_types:
-                        # Print detailed file message
-                        print(f"TYPE: {msg_type}")
-                        for k in [
-                            "FROM", "TO", "FILENAME", "FILESIZE", "FILETYPE", "FILEID", "DESCRIPTION",
-                            "TIMESTAMP", "TOKEN", "TOTAL_CHUNKS", "CHUNK_SIZE", "CHUNK_INDEX", "DATA",
-                            "STATUS", "MESSAGE_ID"
-                        ]:
-                            if k in msg and msg[k] != "":
-                                # For DATA, print only a short preview
-                                if k == "DATA":
-                                    data_val = msg[k]
-                                    preview = data_val[:32] + ("..." if len(data_val) > 32 else "")
-                                    print(f"{k}: {preview}")
-                                else:
-                                    print(f"{k}: {msg[k]}")
-                        print()
-                    # Only show old verbose for non-PING, non-PROFILE, non-POST, non-DM, non-file messages
-                    elif msg_type not in ('PING', 'PROFILE', 'POST', 'DM'):
-                        print(f"\nRECV< {t} {addr[0]}:{addr[1]} TYPE={msg_type}")
-
-                # Route message to appropriate handler
-                self.message_router(msg, addr)
-
+            loop.run_until_complete(self.serve(sock))
         except KeyboardInterrupt:
             print("\n[INFO] Listener stopped.")
         finally:
             self.running = False
+            self._loop = None
+            loop.close()
             sock.close()
+
+    async def serve(self, sock: socket.socket) -> None:
+        """Receive on the bound socket and run timers on the current loop until stop()."""
+        loop = asyncio.get_running_loop()
+        self._stopped = loop.create_future()
+        if self.worker_index:
+            # Datagram endpoints don't expose ancillary data, so read with recvmsg() directly
+            transport = None
+            loop.add_reader(sock.fileno(), self._receive_unicast, sock)
+        elif RECVMMSG_SUPPORTED:
+            # Take every queued datagram in one recvmmsg() per wakeup
+            transport = None
+            loop.add_reader(sock.fileno(), self._receive_batch, sock, RecvBatch(BUFFER_SIZE))
+        else:
+            transport, _ = await loop.create_datagram_endpoint(lambda: _DatagramProtocol(self), sock=sock)
+        self._loop = loop
+        self.running = True
+        self.ready.set()
+        self._arm_timers()  # timers may have been added before the loop existed
+        if self._stop_requested.is_set():
+            self._finish()
+        try:
+            await self._stopped
+        finally:
+            if self._timer_handle is not None:
+                self._timer_handle.cancel()
+                self._timer_handle = None
+            if transport is not None:
+                transport.abort()
+            else:
+                loop.remove_reader(sock.fileno())
+
+    def _receive_batch(self, sock: socket.socket, batch: RecvBatch) -> None:
+        """Route every datagram a single recvmmsg() returns."""
+        try:
+            datagrams = batch.recv(sock)
+        except Exception as e:
+            if self.verbose:
+                ui_print(f"Receive error: {e}")
+            return
+        for data, addr in datagrams:
+            self._dispatch(data, addr)
+
+    def _receive_unicast(self, sock: socket.socket) -> None:
+        """Read one datagram and route it unless it was a broadcast; worker 0 gets its own copy of those."""
+        try:
+            data, ancdata, _flags, addr = sock.recvmsg(BUFFER_SIZE, _PKTINFO_SPACE)
+        except BlockingIOError:
+            return
+        except Exception as e:
+            if self.verbose:
+                ui_print(f"Receive error: {e}")
+            return
+        for level, kind, info in ancdata:
+            # in_pktinfo: ifindex, local address, header destination address
+            if level == socket.IPPROTO_IP and kind == IP_PKTINFO and info[4:8] != info[8:12]:
+                return
+        self._dispatch(data, addr)
+
+    def _dispatch(self, data: bytes, addr: tuple) -> None:
+        """Decode, parse and route one received datagram."""
+        msg = parse_message(data)
+        if not msg:
+            if self.verbose:
+                ui_print(f"DROP! Invalid or unterminated message from {addr}.")
+            return
+
+        if self.verbose:
+            t = time.strftime("%H:%M:%S")
+            file_types = (
+                'FILE_OFFER', 'FILE_CHUNK', 'FILE_RECEIVED', 'FILE_ACCEPT', 'FILE_REJECT'
+            )
+            msg_type = msg.get('TYPE', '?')
+            if msg_type in file_types:
+                # Print detailed file message
+                ui_print(f"TYPE: {msg_type}")
+                for k in [
+                    "FROM", "TO", "FILENAME", "FILESIZE", "FILETYPE", "FILEID", "DESCRIPTION",
+                    "TIMESTAMP", "TOKEN", "TOTAL_CHUNKS", "CHUNK_SIZE", "CHUNK_INDEX", "DATA",
+                    "STATUS", "MESSAGE_ID"
+                ]:
+                    if k in msg and msg[k] != "":
+                        # For DATA, print only a short preview
+                        if k == "DATA":
+                            data_val = msg[k]
+                            preview = data_val[:32] + ("..." if len(data_val) > 32 else "")
+                            ui_print(f"{k}: {preview}")
+                        else:
+                            ui_print(f"{k}: {msg[k]}")
+                ui_print()
+            # Only show old verbose for non-PING, non-PROFILE, non-POST, non-DM, non-file messages
+            elif msg_type not in ('PING', 'PROFILE', 'POST', 'DM'):
+                ui_print(f"\nRECV< {t} {addr[0]}:{addr[1]} TYPE={msg_type}")
+
+        # Route message to appropriate handler
+        self.message_router(msg, addr)
     
     def stop(self) -> None:
-        """Stop the listener."""
+        """Stop the listener; safe to call from any thread."""
         self.running = False
+        self._stop_requested.set()
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._finish)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _finish(self) -> None:
+        if self._stopped is not None and not self._stopped.done():
+            self._stopped.set_result(None)
@@ -1,13 +1,23 @@
 """LSNP Protocol implementation."""
+import random
+from typing import Union
 
 
-def parse_message(raw: str) -> dict:
+def new_message_id() -> str:
+    """Return a fresh 8-hex-digit MESSAGE_ID (not a security token, so no urandom/UUID needed)."""
+    return f"{random.getrandbits(32):08x}"
+
+
+def parse_message(raw: Union[str, bytes]) -> dict:
     """
     Parse an LSNP message into a dict.
     Tolerates \\r\\n line endings and extra trailing whitespace.
     Only the header before the first blank line is parsed.
     Returns {} if the message doesn't contain a proper blank-line terminator.
+    Raw datagram bytes are decoded once, header only, then split like the str path.
     """
+    if isinstance(raw, (bytes, bytearray)):
+        return _parse_bytes(raw)
     if not isinstance(raw, str):
         return {}
 
@@ -28,6 +38,23 @@ def parse_message(raw: str) -> dict:
     return msg
 
 
+def _parse_bytes(raw: bytes) -> dict:
+    """parse_message() for undecoded bytes: decode the header once, then split it."""
+    if b"\r" in raw:
+        raw = raw.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+    end = raw.find(b"\n\n")
+    if end < 0:
+        return {}
+
+    msg = {}
+    for line in raw[:end].decode("utf-8", errors="ignore").split("\n"):
+        k, sep, v = line.partition(": ")
+        if sep:
+            msg[k.strip()] = v.strip()
+    return msg
+
+
 def build_message(fields: dict) -> str:
     """
     Build an LSNP message string from fields, guaranteeing a blank-line terminator.
@@ -37,3 +64,64 @@ def build_message(fields: dict) -> str:
 
     body = "".join(f"{k}: {v}\n" for k, v in fields.items())
     return body + "\n"  # => ensures final "\n\n"
+
+
+def build_message_into(buf: bytearray, fields: dict) -> int:
+    """
+    Encode an LSNP message into buf (cleared first) and return its length.
+    Lets hot send paths reuse one buffer instead of allocating str + bytes per message.
+    """
+    if not isinstance(fields, dict):
+        raise TypeError("fields must be a dict")
+
+    buf.clear()
+    for k, v in fields.items():
+        buf += f"{k}: {v}\n".encode("utf-8")
+    buf += b"\n"
+    return len(buf)
+
+
+def build_message_bytes(fields: dict) -> bytes:
+    """build_message(), encoded to UTF-8 in one step for callers that send it straight away."""
+    return build_message(fields).encode("utf-8")
+
+
+# Fixed-schema builders for the hot per-user message types. They return the same
+# bytes as build_message_bytes() with the same field order, minus the dict walk;
+# the constant TYPE line is encoded once here.
+_POST_PREFIX = b"TYPE: POST\n"
+_DM_PREFIX = b"TYPE: DM\n"
+_LIKE_PREFIX = b"TYPE: LIKE\n"
+_FOLLOW_PREFIXES = {"FOLLOW": b"TYPE: FOLLOW\n", "UNFOLLOW": b"TYPE: UNFOLLOW\n"}
+
+
+def build_post(user_id: str, content: str, timestamp: int, ttl: int,
+               message_id: str, token: str) -> bytes:
+    """Build a POST message."""
+    return _POST_PREFIX + (
+        f"USER_ID: {user_id}\nCONTENT: {content}\nTIMESTAMP: {timestamp}\n"
+        f"TTL: {ttl}\nMESSAGE_ID: {message_id}\nTOKEN: {token}\n\n").encode("utf-8")
+
+
+def build_dm(from_user: str, to_user: str, content: str, timestamp: int,
+             message_id: str, token: str) -> bytes:
+    """Build a DM message."""
+    return _DM_PREFIX + (
+        f"FROM: {from_user}\nTO: {to_user}\nCONTENT: {content}\n"
+        f"TIMESTAMP: {timestamp}\nMESSAGE_ID: {message_id}\nTOKEN: {token}\n\n").encode("utf-8")
+
+
+def build_like(from_user: str, to_user: str, post_id: str, action: str, timestamp: int,
+               message_id: str, token: str) -> bytes:
+    """Build a LIKE message (action is LIKE or UNLIKE)."""
+    return _LIKE_PREFIX + (
+        f"FROM: {from_user}\nTO: {to_user}\nPOST_ID: {post_id}\n"
+        f"ACTION: {action}\nTIMESTAMP: {timestamp}\nMESSAGE_ID: {message_id}\nTOKEN: {token}\n\n").encode("utf-8")
+
+
+def build_follow(msg_type: str, message_id: str, from_user: str, to_user: str,
+                 timestamp: int, token: str) -> bytes:
+    """Build a FOLLOW or UNFOLLOW message."""
+    return _FOLLOW_PREFIXES[msg_type] + (
+        f"MESSAGE_ID: {message_id}\nFROM: {from_user}\nTO: {to_user}\n"
+        f"TIMESTAMP: {timestamp}\nTOKEN: {token}\n\n").encode("utf-8")
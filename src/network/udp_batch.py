@@ -0,0 +1,278 @@
+"""Batched UDP I/O via sendmmsg(2)/recvmmsg(2), with plain per-datagram calls elsewhere."""
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+Datagram = Tuple[bytes, Tuple[str, int]]
+
+COALESCE_MAX_PACKETS = 50       # inside hold(), send once this many are queued
+COALESCE_MAX_BYTES = 60 * 1024  # ...or once this many bytes are queued
+RECV_BATCH_SIZE = 64            # datagrams taken per recvmmsg call
+
+
+class BatchSendError(OSError):
+    """sendmmsg failed part-way; `sent` datagrams went out before the failing one."""
+
+    def __init__(self, errno_: int, sent: int):
+        super().__init__(errno_, os.strerror(errno_))
+        self.sent = sent
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [
+        ("iov_base", ctypes.c_void_p),
+        ("iov_len", ctypes.c_size_t),
+    ]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_uint32),
+        ("sin_zero", ctypes.c_char * 8),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_hdr", _MsgHdr),
+        ("msg_len", ctypes.c_uint),
+    ]
+
+
+def _load_libc_fn(name: str, argtypes: list):
+    """Return the named libc function, or None where it isn't available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fn = getattr(libc, name)
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = argtypes
+    fn.restype = ctypes.c_int
+    return fn
+
+
+_sendmmsg = _load_libc_fn(
+    "sendmmsg", [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int])
+_recvmmsg = _load_libc_fn(
+    "recvmmsg", [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p])
+RECVMMSG_SUPPORTED = _recvmmsg is not None
+
+
+def _sockaddr(addr: Tuple[str, int]) -> _SockAddrIn:
+    sa = _SockAddrIn()
+    sa.sin_family = socket.AF_INET
+    sa.sin_port = socket.htons(addr[1])
+    # inet_aton bytes are already in network order; keep their layout as-is
+    sa.sin_addr = struct.unpack("=I", socket.inet_aton(addr[0]))[0]
+    return sa
+
+
+def sendmmsg_batch(sock: socket.socket, batch: List[Datagram]) -> int:
+    """
+    Send every (payload, (ip, port)) in batch on sock, in as few syscalls as possible.
+    Returns the number of datagrams sent; raises BatchSendError if the kernel rejects one.
+    """
+    if not batch:
+        return 0
+    if _sendmmsg is None or len(batch) == 1:
+        for data, addr in batch:
+            sock.sendto(data, addr)
+        return len(batch)
+
+    n = len(batch)
+    msgs = (_MMsgHdr * n)()
+    iovs = (_IoVec * n)()
+    names = (_SockAddrIn * n)()
+    bufs = []  # keep payload pointers alive until the call returns
+    for i, (data, addr) in enumerate(batch):
+        buf = ctypes.c_char_p(data)
+        bufs.append(buf)
+        iovs[i].iov_base = ctypes.cast(buf, ctypes.c_void_p)
+        iovs[i].iov_len = len(data)
+        names[i] = _sockaddr(addr)
+        hdr = msgs[i].msg_hdr
+        hdr.msg_name = ctypes.cast(ctypes.byref(names[i]), ctypes.c_void_p)
+        hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+        hdr.msg_iov = ctypes.pointer(iovs[i])
+        hdr.msg_iovlen = 1
+
+    fd = sock.fileno()
+    sent = 0
+    while sent < n:
+        rc = _sendmmsg(fd, ctypes.byref(msgs[sent]), n - sent, 0)
+        if rc < 0:
+            raise BatchSendError(ctypes.get_errno(), sent)
+        sent += rc
+    return sent
+
+
+class RecvBatch:
+    """
+    Receives up to `size` datagrams per recvmmsg(2) call on a non-blocking socket.
+    The buffers and message headers are allocated once and reused by every call.
+    """
+
+    def __init__(self, bufsize: int, size: int = RECV_BATCH_SIZE):
+        self._size = size
+        self._bufs = [ctypes.create_string_buffer(bufsize) for _ in range(size)]
+        self._iovs = (_IoVec * size)()
+        self._names = (_SockAddrIn * size)()
+        self._msgs = (_MMsgHdr * size)()
+        for i, buf in enumerate(self._bufs):
+            self._iovs[i].iov_base = ctypes.cast(buf, ctypes.c_void_p)
+            self._iovs[i].iov_len = bufsize
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = ctypes.cast(ctypes.byref(self._names[i]), ctypes.c_void_p)
+            hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            hdr.msg_iovlen = 1
+
+    def recv(self, sock: socket.socket) -> List[Datagram]:
+        """Return the datagrams waiting on sock (none if it would block)."""
+        msgs = self._msgs
+        namelen = ctypes.sizeof(_SockAddrIn)
+        for i in range(self._size):
+            msgs[i].msg_hdr.msg_namelen = namelen  # the kernel overwrites it on each call
+        rc = _recvmmsg(sock.fileno(), msgs, self._size, 0, None)
+        if rc < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return []
+            raise OSError(err, os.strerror(err))
+        out = []
+        for i in range(rc):
+            name = self._names[i]
+            ip = socket.inet_ntoa(struct.pack("=I", name.sin_addr))
+            data = ctypes.string_at(self._bufs[i], msgs[i].msg_len)  # copies only the datagram
+            out.append((data, (ip, socket.ntohs(name.sin_port))))
+        return out
+
+
+class Coalescer:
+    """
+    Sends outgoing datagrams with sendmmsg_batch(), batching only under back-pressure:
+    a datagram queued while the socket is idle goes out at once, and anything queued
+    while a flush is in progress (or inside a hold() block) leaves with the next batch.
+    """
+
+    def __init__(
+        self,
+        get_sock: Callable[[], socket.socket],
+        on_error: Optional[Callable[[bytes, Tuple[str, int], OSError], None]] = None,
+        is_verbose: Callable[[], bool] = lambda: False,
+        send_one: Optional[Callable[[bytes, Tuple[str, int]], None]] = None,
+    ):
+        self._get_sock = get_sock
+        # Used instead of get_sock().sendto() when a batch holds a single datagram
+        self._send_one = send_one
+        self._on_error = on_error
+        self._is_verbose = is_verbose
+        self._pending: List[Datagram] = []
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+        self._flushing = False  # some thread is draining _pending
+        self._holds = 0         # open hold() blocks
+
+    def enqueue(self, data: bytes, addr: Tuple[str, int]) -> None:
+        """Queue one datagram; it is sent now unless a flush or hold() is in progress."""
+        with self._lock:
+            self._pending.append((data, addr))
+            self._pending_bytes += len(data)
+            if self._flushing:
+                return  # the flushing thread picks it up
+            full = (len(self._pending) >= COALESCE_MAX_PACKETS
+                    or self._pending_bytes >= COALESCE_MAX_BYTES)
+            if self._holds and not full:
+                return
+            self._flushing = True
+        self._drain()
+
+    def flush(self) -> None:
+        """Send everything queued so far (a flush already running in another thread will)."""
+        with self._lock:
+            if self._flushing or not self._pending:
+                return
+            self._flushing = True
+        self._drain()
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Queue everything enqueued inside the block and send it as one batch on exit."""
+        with self._lock:
+            self._holds += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holds -= 1
+                start = not self._holds and not self._flushing and bool(self._pending)
+                if start:
+                    self._flushing = True
+            if start:
+                self._drain()
+
+    def _drain(self) -> None:
+        """Send batches until the queue is empty. Caller has set _flushing."""
+        try:
+            while True:
+                with self._lock:
+                    batch, self._pending = self._pending, []
+                    self._pending_bytes = 0
+                    if not batch:
+                        # Cleared while still holding the lock, so an enqueue() can't slip in
+                        # between this check and the reset and be left behind
+                        self._flushing = False
+                        return
+                self._send(batch)
+        except BaseException:
+            with self._lock:
+                self._flushing = False
+            raise
+
+    def _send(self, batch: List[Datagram]) -> None:
+        if len(batch) == 1 and self._send_one:
+            data, addr = batch[0]
+            try:
+                self._send_one(data, addr)
+            except OSError as err:
+                if self._on_error:
+                    self._on_error(data, addr, err)
+            return
+
+        sock = self._get_sock()
+        try:
+            sendmmsg_batch(sock, batch)
+        except OSError as e:
+            # Send the rest one by one so a single bad destination doesn't drop the others
+            for data, addr in batch[getattr(e, "sent", 0):]:
+                try:
+                    sock.sendto(data, addr)
+                except OSError as err:
+                    if self._on_error:
+                        self._on_error(data, addr, err)
+            return
+
+        if self._is_verbose() and len(batch) > 1:
+            print(f"[BATCH] Flushed {len(batch)} datagrams in one send")
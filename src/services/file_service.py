@@ -2,13 +2,12 @@
 import os
 import math
 import base64
-import uuid
 import time
 import threading
 from typing import Dict, Optional
 
 from ..network.client import NetworkManager, extract_ip_from_user_id
-from ..network.protocol import build_message
+from ..network.protocol import build_message, build_message_bytes, new_message_id
 from ..core.state import app_state
 from ..models.user import User
 
@@ -42,7 +41,7 @@ class FileService:
 
         filesize = os.path.getsize(file_path)
         filename = os.path.basename(file_path)
-        fileid = uuid.uuid4().hex[:8]
+        fileid = new_message_id()
         ts = int(time.time())
         token = f"{self.user.user_id}|{ts+3600}|file"
 
@@ -61,7 +60,7 @@ class FileService:
             "TOKEN": token,
             "TOTAL_CHUNKS": str(total_chunks),
             "CHUNK_SIZE": str(DEFAULT_CHUNK_SIZE),
-            "MESSAGE_ID": uuid.uuid4().hex[:8],
+            "MESSAGE_ID": new_message_id(),
         }
 
         # Do NOT broadcast file offers; only send unicast to the recipient
@@ -116,6 +115,8 @@ class FileService:
             print("Not sending file chunks to yourself.")
             return
 
+        # Resolved once for the whole transfer; the FILE_OFFER already recorded the token
+        addr = self.network.resolve(to_uid)
         try:
             with open(path, "rb") as f:
                 while True:
@@ -133,23 +134,31 @@ class FileService:
                         "CHUNK_SIZE": str(len(chunk)),
                         "DATA": data_b64,
                         "TOKEN": meta["token"],
-                        "MESSAGE_ID": uuid.uuid4().hex[:8],
+                        "MESSAGE_ID": new_message_id(),
                         "TIMESTAMP": str(int(time.time())),
                     }
 
                     # Do NOT broadcast file chunks; only send unicast to the recipient
-                    sent = self.network.send_unicast(build_message(fields), to_uid)
-                    if not sent:
+                    data = build_message_bytes(fields)
+                    if addr is None:
+                        addr = self.network.resolve(to_uid)
+                    sent = addr is not None and self.network.send_to(data, addr)
+                    if not sent and addr is not None:
                         # retry once
-                        time.sleep(SEND_RETRY_DELAY)
-                        self.network.send_unicast(build_message(fields), to_uid)
+                        if app_state.shutdown_event.wait(SEND_RETRY_DELAY):
+                            break
+                        self.network.send_to(data, addr)
                     idx += 1
-                    time.sleep(0.01)
+                    # Pace the chunks; stop early if the app is shutting down
+                    if app_state.shutdown_event.wait(0.01):
+                        break
         except Exception as e:
             print(f"Error while sending chunks for {fileid}: {e}")
             self.outgoing.pop(fileid, None)
             return
 
+        if app_state.shutdown_event.is_set():
+            return  # cut short by shutdown
         print(f"Finished sending file {meta['filename']} -> {to_uid}")
         meta["state"] = "sent"
 
@@ -219,7 +228,7 @@ class FileService:
             "TO": sender,
             "FILEID": fileid,
             "TIMESTAMP": str(ts),
-            "MESSAGE_ID": uuid.uuid4().hex[:8],
+            "MESSAGE_ID": new_message_id(),
         }
         sent = self.network.send_unicast(build_message(fields), sender)
         if sent:
@@ -249,7 +258,7 @@ class FileService:
             "TO": sender,
             "FILEID": fileid,
             "TIMESTAMP": str(ts),
-            "MESSAGE_ID": uuid.uuid4().hex[:8],
+            "MESSAGE_ID": new_message_id(),
         }
         sent = self.network.send_unicast(build_message(fields), sender)
         return bool(sent)
@@ -301,7 +310,7 @@ class FileService:
             "FILEID": fileid,
             "STATUS": "COMPLETE",
             "TIMESTAMP": str(int(time.time())),
-            "MESSAGE_ID": uuid.uuid4().hex[:8],
+            "MESSAGE_ID": new_message_id(),
         }
         self.network.send_unicast(build_message(fields), rec["from"])
         # send FILE_RECEIVED back
@@ -312,6 +321,6 @@ class FileService:
             "FILEID": fileid,
             "STATUS": "COMPLETE",
             "TIMESTAMP": str(int(time.time())),
-            "MESSAGE_ID": uuid.uuid4().hex[:8],
+            "MESSAGE_ID": new_message_id(),
         }
         self.network.send_unicast(build_message(fields), rec["from"])
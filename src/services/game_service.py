@@ -1,13 +1,12 @@
 """Game service for Tic Tac Toe."""
 import time
-import uuid
 import random
 from typing import List, Optional
 
 from ..models.user import User
 from ..models.game import TicTacToeGame, TicTacToeInvite, Symbol, GameState
 from ..network.client import NetworkManager
-from ..network.protocol import build_message
+from ..network.protocol import build_message, new_message_id
 from ..core.state import app_state
 
 ACK_TIMEOUT = 2.0
@@ -22,7 +21,7 @@ class GameService:
     def create_game_invite(self, opponent_id: str, symbol: Symbol, user: User) -> Optional[str]:
         """Create and send a game invite."""
         game_id = f"g{random.randint(0, 255)}"
-        message_id = uuid.uuid4().hex[:8]
+        message_id = new_message_id()
         timestamp = int(time.time())
         token = f"{user.user_id}|{timestamp+3600}|game"
 
@@ -100,17 +99,9 @@ class GameService:
             # Find winning line if any
             winning_line = None
             if winner:
-                wins = [
-                    [0,1,2],[3,4,5],[6,7,8],
-                    [0,3,6],[1,4,7],[2,5,8],
-                    [0,4,8],[2,4,6]
-                ]
-                for combo in wins:
-                    if all(game.board[i] == winner for i in combo):
-                        winning_line = ",".join(map(str, combo))
-                        break
-
-            message_id = uuid.uuid4().hex[:8]
+                winning_line = ",".join(map(str, game.winning_line()))
+
+            message_id = new_message_id()
             timestamp  = int(time.time())
             token      = f"{user.user_id}|{timestamp+3600}|game"
 
@@ -143,7 +134,7 @@ class GameService:
             return True
 
         # Otherwise, send the MOVE packet
-        message_id = uuid.uuid4().hex[:8]
+        message_id = new_message_id()
         timestamp  = int(time.time())
         token      = f"{user.user_id}|{timestamp+3600}|game"
 
@@ -183,7 +174,7 @@ class GameService:
 
         # --- Send INVITE first (with ACK retries) ---
         ts_inv = int(time.time())
-        invite_mid = uuid.uuid4().hex[:8]
+        invite_mid = new_message_id()
         invite_fields = {
             "TYPE": "TICTACTOE_INVITE",
             "FROM": user.user_id,
@@ -215,7 +206,7 @@ class GameService:
 
         # --- Send MOVE (with ACK retries) ---
         ts_mv = int(time.time())
-        move_mid = uuid.uuid4().hex[:8]
+        move_mid = new_message_id()
         move_fields = {
             "TYPE": "TICTACTOE_MOVE",
             "FROM": user.user_id,
@@ -261,7 +252,7 @@ class GameService:
     def reject_invite(self, invite: TicTacToeInvite, user: User) -> bool:
         """Reject a game invite."""
         timestamp = int(time.time())
-        message_id = uuid.uuid4().hex[:8]
+        message_id = new_message_id()
         my_symbol = Symbol.O if invite.symbol == Symbol.X else Symbol.X
         
         result_fields = {
@@ -336,8 +327,8 @@ class GameService:
             except Exception as e:
                 if getattr(self.network_manager, "verbose", False):
                     print(f"[ACK] Send error on attempt {attempt}: {e}")
-                if attempt < ACK_ATTEMPTS:
-                    time.sleep(0.5)  # Short delay before retry
+                if attempt < ACK_ATTEMPTS and app_state.shutdown_event.wait(0.5):
+                    break  # Short delay before retry, cut short on shutdown
 
         # Give up after all attempts
         if getattr(self.network_manager, "verbose", False):
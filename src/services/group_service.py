@@ -1,7 +1,6 @@
 """Group service for group management operations."""
 import time
-import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from ..models.user import User
 from ..models.group import Group, GroupMessage
@@ -49,12 +48,9 @@ class GroupService:
         
         create_msg = build_message(fields)
         
-        # Send to all members
-        success = True
-        for member_id in group.members:
-            if member_id != user.user_id:  # Don't send to self
-                if not self.network_manager.send_unicast(create_msg, member_id):
-                    success = False
+        # Send to all members except self
+        recipients = [m for m in group.members if m != user.user_id]
+        success = self.network_manager.send_unicast_many(create_msg, recipients)
         
         return success
     
@@ -93,10 +89,9 @@ class GroupService:
         
         # Send to all current members (including newly added ones)
         updated_group = app_state.get_group(group_id)
-        if updated_group:
-            for member_id in updated_group.members:
-                if user and member_id != user.user_id:  # Don't send to self
-                    self.network_manager.send_unicast(update_msg, member_id)
+        if updated_group and user:
+            recipients = [m for m in updated_group.members if m != user.user_id]  # Don't send to self
+            self.network_manager.send_unicast_many(update_msg, recipients)
         
         return True
     
@@ -125,11 +120,8 @@ class GroupService:
         message_text = build_message(fields)
         
         # Send to all group members except self
-        success = True
-        for member_id in group.members:
-            if member_id != user.user_id:
-                if not self.network_manager.send_unicast(message_text, member_id):
-                    success = False
+        recipients = [m for m in group.members if m != user.user_id]
+        success = self.network_manager.send_unicast_many(message_text, recipients)
         
         # Add to local message history
         group_message = GroupMessage(
@@ -151,7 +143,7 @@ class GroupService:
         """Get all groups that a user is a member of."""
         return app_state.get_groups_for_user(user_id)
     
-    def get_group_messages(self, group_id: str) -> List[GroupMessage]:
+    def get_group_messages(self, group_id: str) -> Tuple[GroupMessage, ...]:
         """Get all messages for a group."""
         return app_state.get_group_messages(group_id)
     
@@ -1,11 +1,10 @@
 """Message service for posts and direct messages."""
 import time
-import uuid
-from typing import List, Optional
+from typing import List, Mapping, Optional, Tuple
 
 from ..models.user import User, Post, DirectMessage
 from ..network.client import NetworkManager
-from ..network.protocol import build_message
+from ..network.protocol import build_post, build_dm, build_like, new_message_id
 from ..core.state import app_state
 
 
@@ -16,37 +15,26 @@ class MessageService:
         self.network_manager = network_manager
 
     def create_post(self, content: str, user: User) -> bool:
-        import time, uuid
-        message_id = uuid.uuid4().hex[:8]
+        message_id = new_message_id()
         timestamp = int(time.time())
         ttl = 3600
         token = f"{user.user_id}|{timestamp+ttl}|broadcast"
 
-        fields = {
-            "TYPE": "POST",
-            "USER_ID": user.user_id,
-            "CONTENT": content,
-            "TIMESTAMP": timestamp,
-            "TTL": ttl,
-            "MESSAGE_ID": message_id,
-            "TOKEN": token,
-        }
-        post_msg = build_message(fields)
+        post_msg = build_post(user.user_id, content, timestamp, ttl, message_id, token)
         self.network_manager.send_broadcast(post_msg)
 
-        # Only add if not already present (dedupe by message_id)
-        if not any(p.message_id == message_id for p in app_state.get_posts(False)):
-            app_state.add_post(
-                Post(
-                    user_id=user.user_id,
-                    display_name=user.display_name,
-                    content=content,
-                    timestamp=timestamp,
-                    message_id=message_id,
-                    likes=set(),
-                    ttl=ttl,
-                )
+        # message_id is freshly generated and PostHandler ignores our own echo, so no dedupe scan
+        app_state.add_post(
+            Post(
+                user_id=user.user_id,
+                display_name=user.display_name,
+                content=content,
+                timestamp=timestamp,
+                message_id=message_id,
+                likes=set(),
+                ttl=ttl,
             )
+        )
         return True
 
     
@@ -54,26 +42,15 @@ class MessageService:
         """Like or unlike a post."""
         action = "LIKE" if is_like else "UNLIKE"
         timestamp = int(time.time())
-        message_id = uuid.uuid4().hex[:8]
+        message_id = new_message_id()
         token = f"{user.user_id}|{timestamp+3600}|broadcast"
 
-        like_fields = {
-            "TYPE": "LIKE",
-            "FROM": user.user_id,
-            "TO": post.user_id,
-            "POST_ID": post.message_id,  # Use MESSAGE_ID for unique post identification
-            "ACTION": action,
-            "TIMESTAMP": timestamp,
-            "MESSAGE_ID": message_id,
-            "TOKEN": token,
-        }
-        like_msg = build_message(like_fields)
+        # POST_ID is the post's MESSAGE_ID, which identifies it uniquely
+        like_msg = build_like(user.user_id, post.user_id, post.message_id, action,
+                              timestamp, message_id, token)
 
-        # Send to author
-        self.network_manager.send_unicast(like_msg, post.user_id)
-        
-        # Broadcast to all peers
-        self.network_manager.send_broadcast(like_msg)
+        # Send to author and broadcast to all peers in one batch
+        self.network_manager.send_unicast_and_broadcast(like_msg, post.user_id)
 
         # Update local state optimistically
         if is_like:
@@ -85,24 +62,17 @@ class MessageService:
     
     def send_direct_message(self, content: str, to_user_id: str, user: User) -> bool:
         """Send a direct message to a user."""
-        message_id = uuid.uuid4().hex[:8]
+        message_id = new_message_id()
         timestamp = int(time.time())
         token = f"{user.user_id}|{timestamp+300}|chat"
 
-        fields = {
-            "TYPE": "DM",
-            "FROM": user.user_id,
-            "TO": to_user_id,
-            "CONTENT": content,
-            "TIMESTAMP": timestamp,
-            "MESSAGE_ID": message_id,
-            "TOKEN": token,
-        }
-        dm_msg = build_message(fields)
+        dm_msg = build_dm(user.user_id, to_user_id, content, timestamp, message_id, token)
 
+        # Token recorded once (by send_broadcast) for both copies
         self.network_manager.send_broadcast(dm_msg)
 
-        success = self.network_manager.send_unicast(dm_msg, to_user_id)
+        addr = self.network_manager.resolve(to_user_id, dm_msg)
+        success = addr is not None and self.network_manager.send_to(dm_msg, addr)
         
         if success:
             # Add to local history here (not in UI)
@@ -118,15 +88,16 @@ class MessageService:
         
         return success
     
-    def get_posts(self, filter_followed: bool = False, user_id: Optional[str] = None) -> List[Post]:
-        """Get posts from the feed."""
-        return app_state.get_posts(filter_followed, user_id)
+    def get_posts(self, filter_followed: bool = False, user_id: Optional[str] = None,
+                  limit: Optional[int] = None) -> List[Post]:
+        """Get posts from the feed; only the newest `limit` if given."""
+        return app_state.get_posts(filter_followed, user_id, limit)
     
-    def get_dm_history(self, user_id: str) -> List[DirectMessage]:
+    def get_dm_history(self, user_id: str, limit: Optional[int] = None) -> Tuple[DirectMessage, ...]:
         """Get direct message history with a user."""
-        return app_state.get_dm_history(user_id)
+        return app_state.get_dm_history(user_id, limit)
     
-    def get_dm_conversations(self) -> dict:
+    def get_dm_conversations(self) -> Mapping[str, int]:
         """Get all DM conversations with message counts."""
         return app_state.get_dm_conversations()
     
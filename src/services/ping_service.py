@@ -1,77 +1,139 @@
 """Ping service for network discovery."""
 import time
-from threading import Thread
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
-from ..models.user import User
+from ..core.state import app_state
+from ..models.user import MAX_PEER_TIMEOUT, User
 from ..network.client import NetworkManager
-from ..network.protocol import build_message
+from ..network.listener import UDPListener
+from ..network.protocol import build_message_bytes
+from .user_service import build_profile_bytes
+
+PING_INTERVAL = 300      # default seconds between pings; the backoff never goes below it
+PROFILE_INTERVAL = 300   # default seconds between profile broadcasts
+PING_MAX_INTERVAL = MAX_PEER_TIMEOUT // 2  # longest backed-off ping interval; receivers allow twice this
+PING_STABLE_ROUNDS = 3   # unchanged rounds before the interval doubles (up to max_ping_interval)
+HEARTBEAT_SLACK = 1.0    # seconds; a PING and PROFILE due this close together leave in one batch
+
+# Encoded PING payloads by (user_id, NEXT_PING_IN); only a handful of intervals occur
+_ping_cache: Dict[Tuple[str, int], bytes] = {}
+
+
+def build_ping_bytes(user: User, next_ping_in: int) -> bytes:
+    """Return the encoded PING message for user, building it once per interval."""
+    key = (user.user_id, next_ping_in)
+    data = _ping_cache.get(key)
+    if data is None:
+        fields = {
+            "TYPE": "PING",
+            "USER_ID": user.user_id,
+            "NEXT_PING_IN": next_ping_in,
+        }
+        data = _ping_cache[key] = build_message_bytes(fields)
+    return data
 
 
 class PingService:
     """Service for network discovery via ping."""
     
-    def __init__(self, network_manager: NetworkManager):
+    def __init__(self, network_manager: NetworkManager, scheduler: UDPListener):
         self.network_manager = network_manager
-        self._ping_thread = None
-        self._profile_thread = None
+        # Periodic sends run as timers on the listener loop instead of their own threads
+        self.scheduler = scheduler
+        self._timers: List[list] = []
         self._running = False
+        # Adaptive ping interval: back off while the peer set is stable, reset on change
+        self._ping_timer: Optional[list] = None
+        self._profile_timer: Optional[list] = None
+        self._profile_owed = False      # a PROFILE deferred to ride with the next PING
+        self._profile_sent_at = 0.0     # monotonic time of the last PROFILE sent with a PING
+        self._min_interval = PING_INTERVAL
+        self._max_interval = PING_INTERVAL
+        self._interval = PING_INTERVAL
+        self._stable_rounds = 0
+        self._last_peers: FrozenSet[str] = frozenset()
     
-    def start_ping_service(self, user: User, ping_interval: int = 300, profile_interval: int = 300) -> None:
-        """Start periodic ping and profile broadcasting."""
+    def start_ping_service(self, user: User, ping_interval: int = PING_INTERVAL,
+                           profile_interval: int = PROFILE_INTERVAL,
+                           max_ping_interval: int = PING_MAX_INTERVAL) -> None:
+        """
+        Start periodic ping and profile broadcasting.
+        Pings go out every ping_interval and back off toward max_ping_interval while
+        the peer set is stable; profiles keep their fixed profile_interval. A ping and
+        profile that fall due together are sent in one batch.
+        """
         self._running = True
-        
-        # Start ping thread
-        self._ping_thread = Thread(
-            target=self._ping_loop,
-            args=(user, ping_interval),
-            daemon=True
-        )
-        self._ping_thread.start()
-        
-        # Start profile broadcast thread
-        self._profile_thread = Thread(
-            target=self._profile_loop,
-            args=(user, profile_interval),
-            daemon=True
-        )
-        self._profile_thread.start()
+        # ping_interval is the floor, so backing off never pings more often than configured
+        self._min_interval = ping_interval
+        self._max_interval = max(ping_interval, max_ping_interval)
+        self._interval = ping_interval
+        self._stable_rounds = 0
+        self._last_peers = frozenset()
+        self._profile_owed = False
+        self._profile_sent_at = 0.0
+        self._ping_timer = self.scheduler.call_every(self._interval, lambda: self._on_ping_timer(user))
+        self._profile_timer = self.scheduler.call_every(profile_interval, lambda: self._on_profile_timer(user))
+        self._timers = [self._ping_timer, self._profile_timer]
     
     def stop_ping_service(self) -> None:
         """Stop the ping service."""
         self._running = False
+        for handle in self._timers:
+            self.scheduler.cancel(handle)
+        self._timers = []
+        self._ping_timer = None
+        self._profile_timer = None
     
-    def _ping_loop(self, user: User, interval: int) -> None:
-        """Ping loop thread."""
-        while self._running:
+    def _due_soon(self, handle: Optional[list]) -> bool:
+        """Whether a timer runs within HEARTBEAT_SLACK seconds (or is already overdue)."""
+        return handle is not None and self.scheduler.next_due(handle) - time.monotonic() <= HEARTBEAT_SLACK
+
+    def _on_ping_timer(self, user: User) -> None:
+        """Send a ping, with the profile in the same batch when that is due too."""
+        if not (self._profile_owed or self._due_soon(self._profile_timer)):
+            self._send_ping(user)
+            return
+        with self.network_manager.batch():
             self._send_ping(user)
-            time.sleep(interval)
-    
-    def _profile_loop(self, user: User, interval: int) -> None:
-        """Profile broadcast loop thread."""
-        while self._running:
             self._send_profile(user)
-            time.sleep(interval)
-    
+        self._profile_owed = False
+        self._profile_sent_at = time.monotonic()
+
+    def _on_profile_timer(self, user: User) -> None:
+        """Send a profile unless it already went, or is about to go, with a ping."""
+        if time.monotonic() - self._profile_sent_at <= HEARTBEAT_SLACK:
+            return
+        if self._due_soon(self._ping_timer):
+            self._profile_owed = True
+            return
+        self._send_profile(user)
+
+    def _adapt_interval(self) -> None:
+        """Double the ping interval after PING_STABLE_ROUNDS quiet rounds; drop back to ping_interval on change."""
+        peers = frozenset(p.user_id for p in app_state.get_active_peers())
+        if peers != self._last_peers:
+            self._last_peers = peers
+            self._stable_rounds = 0
+            interval = self._min_interval
+        else:
+            self._stable_rounds += 1
+            interval = self._interval
+            if self._stable_rounds >= PING_STABLE_ROUNDS:
+                self._stable_rounds = 0
+                interval = min(self._interval * 2, self._max_interval)
+        if interval != self._interval:
+            self._interval = interval
+            if self._ping_timer:
+                self.scheduler.set_interval(self._ping_timer, interval)
+
     def _send_ping(self, user: User) -> None:
-        """Send a ping message."""
-        fields = {
-            "TYPE": "PING",
-            "USER_ID": user.user_id
-        }
-        ping_msg = build_message(fields)
-        self.network_manager.send_broadcast(ping_msg)
+        """Send a ping message advertising when the next one is due."""
+        self._adapt_interval()
+        self.network_manager.send_broadcast(build_ping_bytes(user, self._interval))
         
     def _send_profile(self, user: User) -> None:
         """Send a profile broadcast."""
-        fields = {
-            "TYPE": "PROFILE",
-            "USER_ID": user.user_id,
-            "DISPLAY_NAME": user.display_name,
-            "STATUS": user.status,
-        }
-        profile_msg = build_message(fields)
-
-        self.network_manager.send_broadcast(profile_msg)
+        self.network_manager.send_broadcast(build_profile_bytes(user))
         # print("\n\n====================================================================\n\n" + profile_msg + "====================================================================\n\n")
         
         if user.verbose:
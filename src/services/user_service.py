@@ -1,14 +1,31 @@
 """User management service."""
 import sys
 import time
-import uuid
 from typing import List, Optional
 
 from ..models.user import User, Peer
 from ..network.client import NetworkManager, get_local_ip
-from ..network.protocol import build_message
+from ..network.protocol import build_message, build_message_bytes, build_follow, new_message_id
 from ..core.state import app_state
 
+# Encoded PROFILE payload, rebuilt only when the advertised fields change
+_profile_cache = {"version": None, "bytes": None}
+
+
+def build_profile_bytes(user: User) -> bytes:
+    """Return the encoded PROFILE message for user, reusing the cached bytes."""
+    version = (user.user_id, user.display_name, user.status)
+    if _profile_cache["version"] != version:
+        fields = {
+            "TYPE": "PROFILE",
+            "USER_ID": user.user_id,
+            "DISPLAY_NAME": user.display_name,
+            "STATUS": user.status,
+        }
+        _profile_cache["bytes"] = build_message_bytes(fields)
+        _profile_cache["version"] = version
+    return _profile_cache["bytes"]
+
 
 class UserService:
     """Service for user-related operations."""
@@ -23,60 +40,32 @@ class UserService:
     
     def broadcast_profile(self, user: User) -> None:
         """Broadcast user profile to network."""
-        fields = {
-            "TYPE": "PROFILE",
-            "USER_ID": user.user_id,
-            "DISPLAY_NAME": user.display_name,
-            "STATUS": user.status,
-        }
-        profile_msg = build_message(fields)
-        self.network_manager.send_broadcast(profile_msg)
+        self.network_manager.send_broadcast(build_profile_bytes(user))
     
     def follow_user(self, user_id: str, from_user: User) -> bool:
         """Send follow request to a user."""
-        message_id = uuid.uuid4().hex[:8]
-        timestamp = int(time.time())
-        ttl = 3600
-        token = f"{from_user.user_id}|{timestamp+ttl}|follow"
-
-        fields = {
-            "TYPE": "FOLLOW",
-            "MESSAGE_ID": message_id,
-            "FROM": from_user.user_id,
-            "TO": user_id,
-            "TIMESTAMP": timestamp,
-            "TOKEN": token,
-        }
-        follow_msg = build_message(fields)
-        self.network_manager.send_broadcast(follow_msg)
-        success = self.network_manager.send_unicast(follow_msg, user_id)
-        
-        if success:
-            app_state.follow_user(user_id)
-        
-        return success
+        return self.send_follow("FOLLOW", user_id, from_user)
     
     def unfollow_user(self, user_id: str, from_user: User) -> bool:
         """Send unfollow request to a user."""
-        message_id = uuid.uuid4().hex[:8]
+        return self.send_follow("UNFOLLOW", user_id, from_user)
+    
+    def send_follow(self, msg_type: str, user_id: str, from_user: User) -> bool:
+        """Send a FOLLOW or UNFOLLOW to user_id and update the local follow set on success."""
+        message_id = new_message_id()
         timestamp = int(time.time())
         ttl = 3600
         token = f"{from_user.user_id}|{timestamp+ttl}|follow"
 
-        fields = {
-            "TYPE": "UNFOLLOW",
-            "MESSAGE_ID": message_id,
-            "FROM": from_user.user_id,
-            "TO": user_id,
-            "TIMESTAMP": timestamp,
-            "TOKEN": token,
-        }
-        unfollow_msg = build_message(fields)
-        self.network_manager.send_broadcast(unfollow_msg)
-        success = self.network_manager.send_unicast(unfollow_msg, user_id)
+        msg = build_follow(msg_type, message_id, from_user.user_id, user_id, timestamp, token)
+        # Unicast + broadcast copy in one batch; success means the unicast copy didn't fail
+        success = self.network_manager.send_unicast_and_broadcast(msg, user_id)
         
         if success:
-            app_state.unfollow_user(user_id)
+            if msg_type == "FOLLOW":
+                app_state.follow_user(user_id)
+            else:
+                app_state.unfollow_user(user_id)
         
         return success
     
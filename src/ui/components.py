@@ -1,11 +1,39 @@
 """Base UI components and utilities."""
 import os
-from typing import List, Optional
+import sys
+from typing import List, Optional, Tuple
+
+_CLEAR_SCREEN = "\x1b[2J\x1b[H"  # erase display, cursor home
+_vt_enabled = os.name != "nt"
+
+
+def _enable_vt() -> None:
+    """Turn on ANSI escape handling in the Windows console (once)."""
+    global _vt_enabled
+    _vt_enabled = True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except (AttributeError, OSError):
+        pass
 
 
 def clear_console() -> None:
-    """Clear the console screen."""
-    os.system("cls" if os.name == "nt" else "clear")
+    """Clear the console screen with an ANSI escape instead of spawning cls/clear."""
+    if not _vt_enabled:
+        _enable_vt()
+    sys.stdout.write(_CLEAR_SCREEN)
+    sys.stdout.flush()
+
+
+def write_frame(lines: List[str]) -> None:
+    """Print a whole screen of lines with a single write and flush instead of one print() per line."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 def get_user_input(prompt: str, default: str = "") -> str:
@@ -48,6 +76,14 @@ def get_choice(prompt: str, valid_choices: List[str]) -> Optional[str]:
         print(f"Invalid choice. Valid options: {', '.join(valid_choices)}")
 
 
+def parse_action_key(choice: str, prefixes: str) -> Optional[Tuple[str, int]]:
+    """Split a key like "F3" into ("F", 2): its prefix letter and 0-based index. None if malformed."""
+    prefix, digits = choice[:1], choice[1:]
+    if not prefix or prefix not in prefixes or not digits.isdecimal():
+        return None
+    return prefix, int(digits) - 1
+
+
 def paginate_list(items: List[str], page_size: int = 10) -> List[List[str]]:
     """Paginate a list into chunks."""
     return [items[i:i + page_size] for i in range(0, len(items), page_size)]
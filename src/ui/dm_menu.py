@@ -2,7 +2,7 @@
 from typing import List, Optional
 
 from .components import show_separator, get_choice
-from ..models.user import User, Peer, DirectMessage
+from ..models.user import User, Peer, DirectMessage, username_from_user_id
 from ..services.message_service import MessageService
 from ..services.user_service import UserService
 from ..core.state import app_state
@@ -86,10 +86,11 @@ class DirectMessageMenu:
                 self._show_recent_messages(target_peer.user_id, count=20)
             else:
                 print(f"Failed to send message to {target_peer.display_name}")
-                if target_peer.user_id not in app_state._user_ip_map:
+                target_ip = app_state.get_peer_ip(target_peer.user_id)
+                if target_ip is None:
                     print("   No IP address known for target. Wait for their ping/profile.")
                 else:
-                    print(f"   Target IP: {app_state.get_peer_ip(target_peer.user_id)}")
+                    print(f"   Target IP: {target_ip}")
     
     def _display_dm_history(self, target_peer: Peer) -> None:
         """Display DM history with a user."""
@@ -97,7 +98,7 @@ class DirectMessageMenu:
         if history:
             print("Chat History:")
             for dm in history:
-                display_name = dm.display_name or (dm.from_user.split("@")[0] if "@" in dm.from_user else dm.from_user)
+                display_name = dm.display_name or username_from_user_id(dm.from_user)
                 print(f"{display_name}: {dm.content}")
             print()
         else:
@@ -105,12 +106,12 @@ class DirectMessageMenu:
     
     def _show_recent_messages(self, user_id: str, count: int = 20) -> None:
         """Show recent messages in a conversation."""
-        history = self.message_service.get_dm_history(user_id)
-        if history:
-            recent = history[-count:] if count else history
+        # Copy only the tail we're about to show
+        recent = self.message_service.get_dm_history(user_id, count)
+        if recent:
             print("\n" + "─" * 40)
             for dm in recent:
-                display_name = dm.display_name or (dm.from_user.split("@")[0] if "@" in dm.from_user else dm.from_user)
+                display_name = dm.display_name or username_from_user_id(dm.from_user)
                 print(f"{display_name}: {dm.content}")
             print("─" * 40)
     
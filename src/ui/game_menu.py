@@ -117,9 +117,9 @@ class GameMenu:
             self._handle_game_invite(invites[0])
             return
         
-        # Check for ongoing games with this peer
-        games = [g for g in self.game_service.get_games_for_user(self.user.user_id) 
-                if peer.user_id in g.players.values()]
+        # Check for ongoing games with this peer (indexed by the peer's games)
+        games = [g for g in self.game_service.get_games_for_user(peer.user_id)
+                if self.user.user_id in g.players.values()]
         
         if not games:
             print("No invite or ongoing game with this user.")
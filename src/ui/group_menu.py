@@ -109,8 +109,7 @@ class GroupMenu:
         
         print("\n==== Your Groups ====")
         for i, group in enumerate(groups, 1):
-            creator_peer = app_state.get_peer(group.creator)
-            creator_name = creator_peer.display_name if creator_peer else group.creator.split("@")[0]
+            creator_name = app_state.get_display_name(group.creator)
             role = "Creator" if group.is_creator(self.user.user_id) else "Member"
             
             print(f"[{i}] {group.group_name} (ID: {group.group_id})")
@@ -23,15 +23,13 @@ class MainMenu:
             "Make an Expired Token",
             "Make a Mismatched Scope Token"
         ]
+        self.valid_choices = [str(i) for i in range(len(self.menu_options))]
     
     def show(self) -> Optional[str]:
         """Show the main menu and get user choice."""
         show_menu("LSNP Messaging System", self.menu_options)
         
-        valid_choices = [str(i) for i in range(len(self.menu_options))]
-        choice = get_choice("Select an option", valid_choices)
-        
-        return choice
+        return get_choice("Select an option", self.valid_choices)
     
     def toggle_verbose(self) -> None:
         """Toggle verbose mode."""
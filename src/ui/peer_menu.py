@@ -1,11 +1,15 @@
 """Peer management UI."""
-from typing import List, Optional
+import time
+from typing import List, Optional, Tuple
 
-from .components import show_separator, format_time_ago, get_choice
+from .components import show_separator, format_time_ago, get_choice, parse_action_key, write_frame
 from ..models.user import User, Peer
 from ..services.user_service import UserService
 from ..core.state import app_state
 
+# Action key -> (message TYPE, verb for the result line)
+_FOLLOW_ACTIONS = {"F": ("FOLLOW", "follow"), "U": ("UNFOLLOW", "unfollow")}
+
 
 class PeerMenu:
     """UI for viewing and managing peers."""
@@ -23,53 +27,62 @@ class PeerMenu:
                 print("\nNo active peers found.\n")
                 break
 
-            print("\n==== Active Peers ====")
-            self._display_peers(peers)
-            print("======================")
-            print(f"Total Peers: {len(peers)}")
+            frame = ["\n==== Active Peers ===="]
+            frame += self._peer_lines(peers)
+            frame.append("======================")
+            frame.append(f"Total Peers: {len(peers)}")
+            write_frame(frame)
             
-            choice = input("\nChoose an option: [F#] to follow, [U#] to unfollow, [B] to go back\n").strip().upper()
+            choice = input("\nChoose an option: [F#] to follow, [U#] to unfollow (comma-separate for several, e.g. F1,F3), [B] to go back\n").strip().upper()
             
             if choice == "B":
                 break
             
-            if choice.startswith(("F", "U")) and len(choice) > 1:
-                try:
-                    peer_index = int(choice[1:]) - 1
-                    if 0 <= peer_index < len(peers):
-                        peer = peers[peer_index]
-                        self._handle_follow_unfollow(choice[0], peer)
-                    else:
-                        print("Invalid peer number.\n")
-                except ValueError:
-                    print("Invalid option.\n")
-            else:
+            actions = self._parse_follow_actions(choice, peers)
+            if actions is None:
+                continue
+            # All of the selected follow changes leave in one batched send
+            with self.user_service.network_manager.batch():
+                for msg_type, verb, peer in actions:
+                    self._handle_follow_unfollow(msg_type, verb, peer)
+    
+    def _parse_follow_actions(self, choice: str, peers: List[Peer]) -> Optional[List[Tuple[str, str, Peer]]]:
+        """Parse 'F1' or 'F1,U3,...' into (msg_type, verb, peer) triples; None if any part is invalid."""
+        actions = []
+        for part in choice.split(","):
+            key = parse_action_key(part.strip(), "FU")
+            if key is None:
                 print("Invalid option.\n")
+                return None
+            action, peer_index = key
+            if not 0 <= peer_index < len(peers):
+                print("Invalid peer number.\n")
+                return None
+            msg_type, verb = _FOLLOW_ACTIONS[action]
+            actions.append((msg_type, verb, peers[peer_index]))
+        return actions
     
-    def _display_peers(self, peers: List[Peer]) -> None:
-        """Display list of peers with follow status."""
+    def _peer_lines(self, peers: List[Peer]) -> List[str]:
+        """Lines listing each peer with its follow status."""
+        # One state snapshot and one clock read per redraw, not per peer
+        following = app_state.get_following()
+        now = time.time()
+        lines = []
         for idx, peer in enumerate(peers, start=1):
-            is_following = app_state.is_following(peer.user_id)
+            is_following = peer.user_id in following
             following_status = f"You follow {peer.display_name}" if is_following else f"You are not following {peer.display_name}"
             action_key = f"U{idx}" if is_following else f"F{idx}"
             
-            print(f"{idx}. {peer.display_name} ({peer.user_id})")
-            print(f"{following_status}")
-            print(f"Status    : {peer.status}")
-            print(f"Last Seen : {format_time_ago(peer.seconds_since_seen)}")
-            print(f"Press [{action_key}] to {'Unfollow' if is_following else 'Follow'}\n")
+            lines.append(f"{idx}. {peer.display_name} ({peer.user_id})")
+            lines.append(following_status)
+            lines.append(f"Status    : {peer.status}")
+            lines.append(f"Last Seen : {format_time_ago(int(now - peer.last_seen))}")
+            lines.append(f"Press [{action_key}] to {'Unfollow' if is_following else 'Follow'}\n")
+        return lines
     
-    def _handle_follow_unfollow(self, action: str, peer: Peer) -> None:
+    def _handle_follow_unfollow(self, msg_type: str, verb: str, peer: Peer) -> None:
         """Handle follow/unfollow action."""
-        if action == "F":
-            success = self.user_service.follow_user(peer.user_id, self.user)
-            if success:
-                print(f"Successfully Followed {peer.user_id}\n")
-            else:
-                print(f"Failed to follow {peer.user_id}\n")
-        elif action == "U":
-            success = self.user_service.unfollow_user(peer.user_id, self.user)
-            if success:
-                print(f"Successfully Unfollowed {peer.user_id}\n")
-            else:
-                print(f"Failed to unfollow {peer.user_id}\n")
+        if self.user_service.send_follow(msg_type, peer.user_id, self.user):
+            print(f"Successfully {verb.capitalize()}ed {peer.user_id}\n")
+        else:
+            print(f"Failed to {verb} {peer.user_id}\n")
@@ -1,7 +1,9 @@
 """Posts and feed UI."""
+import heapq
+import time
 from typing import List
 
-from .components import show_separator, format_time_ago, get_choice
+from .components import show_separator, format_time_ago, get_choice, parse_action_key, write_frame
 from ..models.user import User, Post
 from ..services.message_service import MessageService
 from ..core.state import app_state
@@ -59,50 +61,60 @@ class PostsMenu:
     def _show_debug_info(self, filter_followed: bool) -> None:
         """Show debug information when no posts are found."""
         following = app_state.get_following()
-        all_posts = self.message_service.get_posts(False)
+        # Counts and authors come from the feed's indices; no copy of the posts themselves
+        total_posts, authors = app_state.get_post_stats()
         
         print(f"   Following set size: {len(following)}")
         if following:
             print("   Following IDs:")
             for f in sorted(following):
                 print(f"     - {f}")
-        print(f"   Total posts received: {len(all_posts)}")
-        if all_posts:
+        print(f"   Total posts received: {total_posts}")
+        if total_posts:
             print("   Sample authors seen:")
-            authors = set(p.user_id for p in all_posts)
-            for a in sorted(authors)[:10]:
+            # Only the first 10 are shown, so avoid sorting every author
+            for a in heapq.nsmallest(10, authors):
                 print(f"     - {a}")
         print()
     
     def _show_posts_interface(self, posts: List[Post]) -> None:
         """Show posts with like/unlike functionality."""
         while True:
-            print("\n==== LSNP Post Feed ====\n")
-            post_keys = {}
+            frame = ["\n==== LSNP Post Feed ====\n"]
             
+            # One clock read and one user_id lookup per frame, not per post
+            now = time.time()
+            uid = self.user.user_id
             for idx, post in enumerate(posts, start=1):
-                liked = post.has_liked(self.user.user_id)
-                like_action = "U" if liked else "L"
-                action_text = "unlike" if liked else "like"
+                if uid in post.likes:
+                    like_action, action_text = "U", "unlike"
+                else:
+                    like_action, action_text = "L", "like"
+                age = int(now - post.timestamp)
+                if age < 0:
+                    age = 0
                 
-                print(f"[{idx}] ({format_time_ago(post.age_seconds)}) {post.display_name} ({post.user_id})")
-                print(f"Post : {post.content}")
-                print(f"Likes: {post.like_count} - Press [{like_action}{idx}] to {action_text}\n")
-                
-                post_keys[f"{like_action}{idx}"] = post
+                frame.append(f"[{idx}] ({format_time_ago(age)}) {post.display_name} ({post.user_id})")
+                frame.append(f"Post : {post.content}")
+                frame.append(f"Likes: {post.likes_count} - Press [{like_action}{idx}] to {action_text}\n")
             
-            print("========================")
+            frame.append("========================")
+            write_frame(frame)
             choice = input("\n[L#/U#] Like/Unlike post | [B] Back\n").strip().upper()
             
             if choice == "B":
                 break
             
-            post = post_keys.get(choice)
-            if post:
-                is_like = choice.startswith("L")
-                self._handle_like_action(post, is_like)
-            else:
-                print("Invalid post number.")
+            key = parse_action_key(choice, "LU")
+            action, idx = key if key else ("", -1)
+            if 0 <= idx < len(posts):
+                post = posts[idx]
+                is_like = action == "L"
+                # Only the action offered for the post's current state is valid
+                if is_like != post.has_liked(self.user.user_id):
+                    self._handle_like_action(post, is_like)
+                    continue
+            print("Invalid post number.")
     
     def _handle_like_action(self, post: Post, is_like: bool) -> None:
         """Handle like/unlike action on a post."""
@@ -33,7 +33,7 @@ def require_valid_token(msg: dict, addr: tuple, verbose: bool) -> bool:
     expected_scope = EXPECTED_SCOPE.get(mtype, None)
 
     uid = _sender_user_id(mtype, msg)
-    declared_ip = uid.split("@", 1)[1] if uid and "@" in uid else None
+    declared_ip = uid.partition("@")[2] or None if uid else None
 
     # Only ENFORCE IP match for token-bearing message types
     if expected_scope is not None and declared_ip:
@@ -0,0 +1,63 @@
+# console.py
+"""Terminal output for message handlers, written by one printer thread off the receive path."""
+import queue
+import sys
+import threading
+from typing import Callable, Optional, Union
+
+CONSOLE_BATCH = 32  # most lines joined into a single write
+
+# Text, or a callable that renders it on the printer thread; None stops the thread
+_QUEUE: "queue.SimpleQueue[Optional[Union[str, Callable[[], str]]]]" = queue.SimpleQueue()
+_THREAD: Optional[threading.Thread] = None
+_THREAD_LOCK = threading.Lock()
+
+
+def ui_print(text: str = "", end: str = "\n") -> None:
+    """Queue text for the terminal; returns without waiting on the write."""
+    _ensure_printer()
+    _QUEUE.put_nowait(text + end)
+
+
+def ui_print_lazy(render: Callable[[], str], end: str = "\n") -> None:
+    """Queue render() to be called and written by the printer thread, in order with ui_print()."""
+    _ensure_printer()
+    _QUEUE.put_nowait(lambda: render() + end)
+
+
+def _ensure_printer() -> None:
+    global _THREAD
+    if _THREAD is None:
+        with _THREAD_LOCK:
+            if _THREAD is None:
+                _THREAD = threading.Thread(target=_printer, name="lsnp-console", daemon=True)
+                _THREAD.start()
+
+
+def flush_console(timeout: float = 1.0) -> None:
+    """Write whatever is still queued and stop the printer thread."""
+    global _THREAD
+    with _THREAD_LOCK:
+        thread, _THREAD = _THREAD, None  # a later ui_print starts a new one
+    if thread is not None:
+        _QUEUE.put_nowait(None)
+        thread.join(timeout)
+
+
+def _printer() -> None:
+    while True:
+        # Take everything queued so far and write it with one write() and one flush()
+        items = [_QUEUE.get()]
+        while items[-1] is not None and len(items) < CONSOLE_BATCH:
+            try:
+                items.append(_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        done = items[-1] is None
+        if done:
+            items.pop()
+        if items:
+            sys.stdout.write("".join(item if isinstance(item, str) else item() for item in items))
+            sys.stdout.flush()
+        if done:
+            return